@@ -1,6 +1,6 @@
+import io
 import json
 import os
-import threading
 import time
 import base64
 import hashlib
@@ -9,9 +9,15 @@ from functools import wraps
 from flask import Flask, render_template, request, jsonify, send_file, session, redirect, url_for
 from apscheduler.schedulers.background import BackgroundScheduler
 import post  # Import our existing video logic
-import tiktok
 import youtube
 import gemini_image  # Gemini image generation for YouTube
+import ingest
+import jobs
+import janitor
+import job_queue
+import render_pool
+import publisher
+import transport
 
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(32)
@@ -57,6 +63,11 @@ DEFAULT_CONFIG = {
     "facebook_page_id": os.getenv("FACEBOOK_PAGE_ID", ""),
     "facebook_access_token": os.getenv("FACEBOOK_ACCESS_TOKEN", ""),
     "publish_targets": {"facebook": True, "tiktok": False, "youtube": True},
+    "facebook_upload": {
+        "chunked": True,  # Resumable start/transfer/finish upload session instead of one multipart POST
+        "chunk_mb": 8,
+        "resume_max_age_hours": 6,  # Interrupted uploads resume from their last chunk within this window
+    },
     "youtube": {
         "client_id": os.getenv("YOUTUBE_CLIENT_ID", ""),  # يجب أن يكون من Environment Variable
         "client_secret": "",  # لا يُحفظ في config.json، فقط من Environment Variable
@@ -88,6 +99,11 @@ DEFAULT_CONFIG = {
         "size": [1080, 1920],
         "fps": 24,
         "placeholder_bg_color": [20, 30, 60],
+        "engine": "auto",  # auto | ffmpeg | moviepy
+        "segments": 1,  # >1 = encode N keyframe-aligned segments in parallel (ffmpeg engine), 0 = one per CPU core
+        # Per-target encodes made in the same pass as output.mp4 (ffmpeg engine), e.g.
+        # {"tiktok": {"max_bitrate": "6M"}, "youtube": {"crf": 20}, "facebook": {"size": [720, 1280]}}
+        "renditions": {},
     },
     "text_overlay": {
         "font_path": "",  # Empty = auto-detect based on OS
@@ -103,9 +119,72 @@ DEFAULT_CONFIG = {
         "x_pct": 0.5,
         "y_pct": 0.5,
     },
+    "cache": {
+        "dir": ".cache",
+        "overlay_max_mb": 64,
+        # Opt-in: previews decode the base once into memory-mapped raw frames and reuse them.
+        # Frames are uncompressed: 1080x1920 @ 24 fps for 15 s is ~2.2 GB per base video
+        "frame_cache": False,
+        "frames_max_mb": 4096,
+        "images_max_mb": 512,  # Normalized (cropped + scaled) source images for image videos
+        "render_cache": True,  # Reuse a stored video when text, base, style and encoder settings all match
+        "renders_max_mb": 1024,
+    },
+    "preview": {
+        "draft_scale": 0.5,  # quality=draft previews: output size relative to the base
+        "draft_max_seconds": 5,
+        "draft_preset": "ultrafast",
+        "draft_crf": 30,
+    },
+    "ingest": {
+        "enabled": True,  # Normalize uploaded base videos once (size/fps/trim/loudnorm) and render from that
+        "crf": 18,
+        "preset": "veryfast",
+        "loudnorm": "I=-16:TP=-1.5:LRA=11",
+        "wait_seconds": 120,  # How long a render waits for a running ingest before using the original
+        "max_mb": 2048,
+    },
+    "jobs": {
+        "dir": "jobs",  # Every run renders into its own jobs/<id>/ directory
+        "keep": 20,  # Finished job directories kept by the reaper
+        "max_age_hours": 72,  # ...and none older than this (0 = no age limit)
+    },
+    "queue": {
+        "workers": 1,  # Background jobs (renders/uploads) running at once
+        "max_queued": 10,  # Further submissions are refused with 429
+        # Free memory a job needs before it may start next to another one (None: 30% of MemTotal)
+        "job_memory_mb": None,
+    },
+    "render_workers": {
+        "enabled": True,  # Render in persistent subprocesses instead of inside the web server
+        "processes": 1,
+        "max_jobs": 25,  # Replace a worker with a fresh one after this many renders...
+        "max_rss_mb": None,  # ...or once its memory grows past this (None: 40% of MemTotal, ~200 MB on 512 MB)
+    },
+    "publish": {
+        "timeouts": {"facebook": 600, "tiktok": 600, "youtube": 900},  # Seconds per target; targets upload concurrently
+        "retries": {"facebook": 2},  # Retries of resumable failures only (an interrupted chunked Facebook transfer)
+    },
+    "janitor": {
+        "enabled": True,  # Background sweep of generated artifacts (age limit, then LRU down to max_mb)
+        "interval_minutes": 30,
+        "grace_minutes": 10,  # Never touch anything used more recently than this
+        "images": {"max_mb": 200, "max_age_hours": 72},  # uploads/ai_image_*.png
+        "renders": {"max_mb": 1024, "max_age_hours": 72},  # Job dirs of scheduled/run_now/YouTube runs
+        "previews": {"max_mb": 256, "max_age_hours": 12},  # Job dirs of /preview
+    },
     "gemini": {
         "api_key": os.getenv("GEMINI_API_KEY", ""),
         "image_style": "realistic, high quality, vibrant colors, professional, suitable for social media, vertical 9:16 aspect ratio",
+        "audio_path": "",  # Optional audio track for image videos (empty = silent track)
+        "motion": {
+            "effect": "ken_burns",  # ken_burns | none (static image)
+            "zoom_start": 1.0,
+            "zoom_end": 1.15,
+            "pan_x": 0.0,  # -1..1, share of the zoom slack to travel horizontally
+            "pan_y": 0.3,
+            "preset": "veryfast",
+        },
     },
 }
 
@@ -196,17 +275,46 @@ def save_config_file(data):
     with open(CONFIG_FILE, 'w') as f:
         json.dump(safe_data, f, indent=4)
 
-def scheduled_job():
+janitor.start(load_config, log=add_log)
+job_queue.configure(load_config())
+render_pool.start(load_config())  # Pre-warm render workers before the first render
+
+def enqueue_scheduled_job():
+    """APScheduler entry point: scheduled posts go through the job queue at high priority."""
+    try:
+        record = job_queue.submit(scheduled_job, "scheduled", priority=job_queue.PRIORITY_HIGH)
+        add_log(f"📥 Scheduled job queued: {record['id']}")
+    except job_queue.QueueFull as e:
+        add_log(f"❌ Scheduled job dropped, queue is full: {e}")
+
+def scheduled_job(kind="scheduled"):
     """The job that runs automatically."""
     add_log("=" * 60)
     add_log("⏰ Scheduled job started!")
-    import traceback
     
     config = load_config()
     if not config.get('is_active'):
         add_log("⏸ System inactive. Skipping.")
         return
 
+    # Each run renders into its own job directory, so parallel runs never share output files
+    job = jobs.new_job(config, kind)
+    add_log(f"📁 Job {job['id']}: {job['output_video']}")
+    error = None
+    try:
+        error = _run_publish_job(job["config"])
+    finally:
+        manifest = jobs.finish_job(job, error=error)
+    if manifest["state"] != "done":
+        raise RuntimeError(manifest["error"])  # Marks the queued job failed
+
+def _run_publish_job(config):
+    """
+    Render and upload one job; config is job-scoped (paths.output_video is
+    private to this run). Returns None on success, else why the job failed.
+    """
+    import traceback
+
     # Step 1: Check prerequisites
     add_log("📋 Checking prerequisites...")
     paths = config.get("paths") or {}
@@ -218,13 +326,13 @@ def scheduled_job():
         error_msg = f"❌ Base video not found: {base_video}"
         add_log(error_msg)
         add_log("⏹ Scheduled job aborted.")
-        return
+        return error_msg
     
     if not os.path.exists(texts_file):
         error_msg = f"❌ Texts file not found: {texts_file}"
         add_log(error_msg)
         add_log("⏹ Scheduled job aborted.")
-        return
+        return error_msg
     
     add_log(f"✅ Base video found: {base_video}")
     add_log(f"✅ Texts file found: {texts_file}")
@@ -233,7 +341,10 @@ def scheduled_job():
     add_log("🎬 Starting video generation...")
     text = None
     try:
-        text = post.generate_video(config=config)
+        text = render_pool.submit(
+            config, post.generate_video,
+            kwargs={"config": config, "render_base": post.resolve_render_base(config)},
+        ).result()
         add_log(f"✅ Video generated successfully! Caption: {text}")
         
         # Verify output video exists
@@ -241,7 +352,7 @@ def scheduled_job():
             error_msg = f"❌ Output video was not created: {output_video}"
             add_log(error_msg)
             add_log("⏹ Scheduled job aborted.")
-            return
+            return error_msg
         
         file_size = os.path.getsize(output_video)
         add_log(f"✅ Output video verified: {output_video} ({file_size / 1024 / 1024:.2f} MB)")
@@ -251,59 +362,26 @@ def scheduled_job():
         add_log(error_msg)
         add_log(f"📋 Traceback: {error_trace}")
         add_log("⏹ Scheduled job aborted.")
-        return
+        return error_msg
 
-    # Step 3: Upload to platforms
-    targets = config.get("publish_targets") or {}
-    upload_success = False
-    
-    # Facebook
-    if targets.get("facebook", True):
-        add_log("📘 Uploading to Facebook...")
-        try:
-            post.upload_to_facebook(text, config)
-            add_log("✅ Facebook upload completed!")
-            upload_success = True
-        except Exception as e:
-            error_trace = traceback.format_exc()
-            add_log(f"❌ Facebook upload failed: {e}")
-            add_log(f"📋 Traceback: {error_trace}")
-    
-    # TikTok
-    if targets.get("tiktok"):
-        add_log("🎵 Uploading to TikTok...")
-        try:
-            tiktok.upload_to_tiktok(text, config, video_path=output_video)
-            add_log("✅ TikTok upload completed!")
-            upload_success = True
-        except Exception as e:
-            error_trace = traceback.format_exc()
-            add_log(f"❌ TikTok upload failed: {e}")
-            add_log(f"📋 Traceback: {error_trace}")
-    
-    # YouTube
-    if targets.get("youtube"):
-        add_log("📺 Uploading to YouTube...")
-        try:
-            youtube.upload_video(
-                title=text, 
-                description=text + " #shorts #quotes", 
-                file_path=output_video, 
-                config=config
-            )
-            add_log("✅ YouTube upload completed!")
-            upload_success = True
-        except Exception as e:
-            error_trace = traceback.format_exc()
-            add_log(f"❌ YouTube upload failed: {e}")
-            add_log(f"📋 Traceback: {error_trace}")
+    # Step 3: Upload to platforms, all enabled targets at once
+    results = publisher.publish(
+        config, lambda target: post.video_path_for(config, target), text, log=add_log,
+    )
+    upload_success = any(r["ok"] for r in results.values())
+    add_log("⏱️ Upload timings: " + ", ".join(
+        f"{target} {r['seconds']:.1f}s{'' if r['ok'] else ' (failed)'}" for target, r in results.items()
+    ))
     
     # Final status
     if upload_success:
         add_log("✅ Scheduled Task Completed Successfully!")
-    else:
-        add_log("⚠️ Scheduled Task Completed with errors (no successful uploads)")
+        add_log("=" * 60)
+        return None
+    add_log("⚠️ Scheduled Task Completed with errors (no successful uploads)")
     add_log("=" * 60)
+    errors = "; ".join(f"{target}: {r['error']}" for target, r in results.items())
+    return f"no successful uploads ({errors or 'no publish targets enabled'})"
 
 def update_scheduler():
     """Update job timing based on config"""
@@ -333,7 +411,7 @@ def update_scheduler():
             # Add job with integer hour and minute
             # Use timezone explicitly to ensure correct scheduling
             scheduler.add_job(
-                scheduled_job, 
+                enqueue_scheduled_job, 
                 'cron', 
                 hour=hour, 
                 minute=minute,
@@ -467,10 +545,11 @@ def test_facebook():
         if not page_id or not access_token:
             return jsonify({"status": "error", "message": "Page ID و Access Token مطلوبان"}), 400
         
-        import requests
         # Test API call
-        url = f"https://graph.facebook.com/v18.0/{page_id}?fields=name,id&access_token={access_token}"
-        response = requests.get(url, timeout=10)
+        url = f"https://graph.facebook.com/v18.0/{page_id}"
+        response = transport.get(
+            url, params={"fields": "name,id", "access_token": access_token}, timeout=(5, 10), retries=1,
+        )
         
         if response.status_code == 200:
             page_data = response.json()
@@ -661,6 +740,13 @@ def add_quote():
 def logs():
     return jsonify({"logs": _LOGS[-200:]})
 
+@app.route('/render_metrics')
+def render_metrics():
+    """Hit/miss counters of the render caches (fonts, Arabic shaping, disk caches) and janitor totals"""
+    # Renders run in worker processes: their cache counters are added to the server's own
+    metrics = render_pool.merge_metrics(post.render_metrics(), render_pool.worker_metrics())
+    return jsonify({**metrics, "janitor": janitor.stats(), "render_workers": render_pool.stats()})
+
 @app.route('/get_schedule_info')
 def get_schedule_info():
     """Get information about the current schedule"""
@@ -742,8 +828,18 @@ def upload_base_video():
     cfg["paths"]["base_video"] = target_path.replace("\\", "/")
     save_config_file(cfg)
     add_log(f"🎬 Base video uploaded: {cfg['paths']['base_video']}")
+    if (cfg.get("ingest") or {}).get("enabled", True):
+        ingest.start_ingest(cfg, cfg["paths"]["base_video"])
+        add_log("📥 Normalizing base video in the background...")
     return jsonify({"status": "success", "base_video": cfg["paths"]["base_video"]})
 
+@app.route('/ingest_status')
+def ingest_status():
+    """State of the normalized (mezzanine) copy of the current base video"""
+    cfg = load_config()
+    base_video = (cfg.get("paths") or {}).get("base_video", "base.mp4")
+    return jsonify(ingest.status(cfg, base_video))
+
 @app.route('/preview', methods=['POST'])
 def preview():
     cfg = load_config()
@@ -765,9 +861,22 @@ def preview():
             add_log(error_msg)
             return jsonify({"status": "error", "message": error_msg}), 400
         
-        add_log(f"📝 Generating video with base: {base_video}")
-        text = post.generate_video(config=cfg)
-        out_path = (cfg.get("paths") or {}).get("output_video", "output.mp4")
+        params = {**request.args.to_dict(), **(request.get_json(silent=True) or {})}
+        quality = str(params.get("quality", "final")).lower()
+        if quality not in ("draft", "final"):
+            return jsonify({"status": "error", "message": "quality must be draft or final"}), 400
+
+        add_log(f"📝 Generating {quality} video with base: {base_video}")
+        with jobs.job_scope(cfg, "preview") as job:
+            text = render_pool.submit(
+                job["config"], post.generate_video,
+                kwargs={
+                    "config": job["config"], "preview": True, "quality": quality,
+                    # Never block a preview on a running ingest: use the original meanwhile
+                    "render_base": post.resolve_render_base(job["config"], wait_seconds=0),
+                },
+            ).result()
+        out_path = job["output_video"]
         
         if not os.path.exists(out_path):
             error_msg = f"❌ Output video was not created: {out_path}"
@@ -775,7 +884,9 @@ def preview():
             return jsonify({"status": "error", "message": error_msg}), 500
         
         add_log(f"✅ Preview generated successfully: {out_path}")
-        return jsonify({"status": "success", "caption": text, "output_video": out_path})
+        return jsonify({
+            "status": "success", "caption": text, "output_video": out_path, "quality": quality, "job": job["id"],
+        })
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
@@ -791,13 +902,40 @@ def preview():
             # Local, return detailed error
             return jsonify({"status": "error", "message": str(e), "traceback": error_trace}), 500
 
+@app.route('/preview_frame', methods=['GET', 'POST'])
+def preview_frame():
+    """
+    One base-video frame with the text overlay, as an image (no video encode).
+    Params (JSON body or query): t (seconds), text, format (jpeg|png), and an
+    unsaved text_overlay dict to try style edits before saving them.
+    """
+    cfg = load_config()
+    params = request.get_json(silent=True) or {}
+    params = {**request.args.to_dict(), **params}
+    if isinstance(params.get("text_overlay"), dict):
+        cfg = deep_merge(cfg, {"text_overlay": params["text_overlay"]})
+    fmt = str(params.get("format", "jpeg")).lower()
+    try:
+        image = post.render_preview_frame(
+            cfg, text=params.get("text"), t=float(params.get("t", 0) or 0), fmt=fmt,
+        )
+    except Exception as e:
+        add_log(f"❌ Preview frame failed: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+    return send_file(io.BytesIO(image), mimetype="image/png" if fmt == "png" else "image/jpeg")
+
 @app.route('/download_last')
 def download_last():
+    """Newest finished job's video (?job=<id> for a specific one), else the legacy paths.output_video."""
     cfg = load_config()
-    out_path = (cfg.get("paths") or {}).get("output_video", "output.mp4")
-    if not os.path.exists(out_path):
+    job_id = request.args.get("job") or None
+    out_path = jobs.latest_artifact(cfg, job_id=job_id)
+    if out_path is None and not job_id:
+        out_path = (cfg.get("paths") or {}).get("output_video", "output.mp4")
+    if not out_path or not os.path.exists(out_path):
         return jsonify({"status": "error", "message": "No output video yet"}), 404
-    return send_file(out_path, as_attachment=True)
+    os.utime(out_path)  # Recently downloaded: last in line for the janitor's LRU eviction
+    return send_file(os.path.abspath(out_path), as_attachment=True)
 
 @app.route('/tiktok/login')
 def tiktok_login():
@@ -895,7 +1033,7 @@ def tiktok_callback():
     
     import requests
     try:
-        response = requests.post(token_url, data=data, headers=headers)
+        response = transport.post(token_url, data=data, headers=headers)
         response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
         token_data = response.json()
         add_log(f"✅ TikTok token exchange response: {token_data}")
@@ -1046,16 +1184,17 @@ def youtube_generate_and_upload():
         
         add_log(f"🚀 Starting YouTube + Gemini flow for: {topic}")
         
-        # Run in background thread
+        # Run in the background job queue
         def runner():
             try:
-                result = gemini_image.generate_and_upload_to_youtube(
-                    topic=topic,
-                    config=cfg,
-                    title=title or None,
-                    description=description or None,
-                    add_text_overlay=add_text
-                )
+                with jobs.job_scope(cfg, "youtube_gemini") as job:
+                    result = gemini_image.generate_and_upload_to_youtube(
+                        topic=topic,
+                        config=job["config"],
+                        title=title or None,
+                        description=description or None,
+                        add_text_overlay=add_text
+                    )
                 if result.get('youtube_video_id'):
                     add_log(f"🎉 تم الرفع بنجاح! Video ID: {result['youtube_video_id']}")
                     add_log(f"🔗 https://youtube.com/shorts/{result['youtube_video_id']}")
@@ -1065,12 +1204,16 @@ def youtube_generate_and_upload():
                 import traceback
                 add_log(f"❌ YouTube+Gemini flow failed: {e}")
                 add_log(f"📋 Traceback: {traceback.format_exc()}")
+                raise
         
-        thread = threading.Thread(target=runner, daemon=True)
-        thread.start()
+        try:
+            record = job_queue.submit(runner, "youtube_gemini")
+        except job_queue.QueueFull as e:
+            return jsonify({"status": "error", "message": f"قائمة المهام ممتلئة: {e}"}), 429
         
         return jsonify({
             "status": "started",
+            "job_id": record["id"],
             "message": "جاري توليد الصورة والرفع على يوتيوب... راقب السجلات"
         })
     except Exception as e:
@@ -1084,22 +1227,38 @@ def serve_image(filename):
 
 @app.route('/run_now', methods=['POST'])
 def run_now():
-    # Run in separate thread to not block request
-    def runner():
-        # Use the same scheduled_job function to ensure consistency
-        scheduled_job()
-
-    thread = threading.Thread(target=runner, daemon=True)
-    thread.start()
-    return jsonify({"status": "started", "message": "جاري النشر في الخلفية... راقب السجلات"})
+    # Queue the same scheduled_job function to ensure consistency
+    try:
+        record = job_queue.submit(scheduled_job, "run_now", kwargs={"kind": "run_now"})
+    except job_queue.QueueFull as e:
+        return jsonify({"status": "error", "message": f"قائمة المهام ممتلئة: {e}"}), 429
+    return jsonify({"status": "started", "job_id": record["id"], "message": "جاري النشر في الخلفية... راقب السجلات"})
 
 @app.route('/test_scheduled_job', methods=['POST'])
 def test_scheduled_job():
     """Test the scheduled job function manually"""
     add_log("🧪 Manual test of scheduled job triggered")
-    thread = threading.Thread(target=scheduled_job, daemon=True)
-    thread.start()
-    return jsonify({"status": "started", "message": "تم تشغيل المهمة المجدولة للاختبار... راقب السجلات"})
+    try:
+        record = job_queue.submit(
+            scheduled_job, "test", priority=job_queue.PRIORITY_LOW, kwargs={"kind": "test"},
+        )
+    except job_queue.QueueFull as e:
+        return jsonify({"status": "error", "message": f"قائمة المهام ممتلئة: {e}"}), 429
+    return jsonify({"status": "started", "job_id": record["id"], "message": "تم تشغيل المهمة المجدولة للاختبار... راقب السجلات"})
+
+@app.route('/jobs')
+def list_queue_jobs():
+    """Queued/running/finished background jobs (newest first) and queue counters"""
+    return jsonify({"jobs": job_queue.list_jobs(), **job_queue.stats()})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """State of one background job, plus its output manifest once it has one"""
+    record = job_queue.get(job_id)
+    manifest = jobs.get_manifest(load_config(), job_id)
+    if record is None and manifest is None:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    return jsonify({**(record or {"id": job_id, "state": manifest.get("state")}), "output": manifest})
 
 @app.route('/scheduler_status')
 def scheduler_status():
@@ -1164,7 +1323,7 @@ def schedule_once():
         
         # Add new one-time job
         scheduler.add_job(
-            scheduled_job,
+            enqueue_scheduled_job,
             'date',
             run_date=target_time,
             id='once_post',
@@ -0,0 +1,67 @@
+"""
+Benchmark for the text auto-fit in post.create_text_image.
+
+Runs the original linear 2px descent and the binary search over every quote
+in texts.txt, and reports layout passes, time and any line-break mismatch.
+
+Usage: python bench_autofit.py [font_size] [min_font_size]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+import post
+
+
+def run(search, texts, font_path, font_size, min_font_size, size=post.VIDEO_SIZE,
+        max_width_pct=0.86, max_height_pct=0.55, line_spacing_px=14):
+    from PIL import Image, ImageDraw
+
+    draw = ImageDraw.Draw(Image.new('RGBA', size, (0, 0, 0, 0)))
+    max_width_px = int(size[0] * max_width_pct)
+    max_height_px = int(size[1] * max_height_pct)
+
+    results = []
+    passes = 0
+    start = time.perf_counter()
+    for text in texts:
+        layout = post._fit_text_layout(
+            draw, text, font_path, font_size, min_font_size,
+            max_width_px, max_height_px, line_spacing_px, search=search,
+        )
+        passes += layout["passes"]
+        results.append((layout["size"], layout["raw_lines"]))
+    return results, passes, time.perf_counter() - start
+
+
+def cold_run(*args, **kwargs):
+    """run() with the shaping and font caches emptied, so neither search inherits the other's warm caches."""
+    post._shape_text.cache_clear()
+    post._load_truetype.cache_clear()
+    return run(*args, **kwargs)
+
+
+if __name__ == "__main__":
+    font_size = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    min_font_size = int(sys.argv[2]) if len(sys.argv) > 2 else 38
+
+    texts = post.load_texts(post.TEXTS_FILE)
+    font_path = post.find_font_path() or post.FONT_PATH
+    print(f"📝 {len(texts)} texts, font {font_path}, sizes {font_size} → {min_font_size}")
+
+    # Both searches start from the same cold caches
+    linear, linear_passes, linear_time = cold_run("linear", texts, font_path, font_size, min_font_size)
+    bisect, bisect_passes, bisect_time = cold_run("bisect", texts, font_path, font_size, min_font_size)
+
+    mismatches = [i for i, (a, b) in enumerate(zip(linear, bisect)) if a != b]
+
+    print(f"linear: {linear_passes:5d} passes  {linear_time:7.2f}s")
+    print(f"bisect: {bisect_passes:5d} passes  {bisect_time:7.2f}s")
+    print(f"speedup: {linear_time / max(bisect_time, 1e-9):.1f}x")
+    if mismatches:
+        print(f"❌ {len(mismatches)} texts got different sizes/line breaks: {mismatches[:10]}")
+        sys.exit(1)
+    print("✅ Identical sizes and line breaks for every text")
@@ -0,0 +1,75 @@
+"""
+Benchmark for parallel segment encoding in ffmpeg_render.
+
+Renders the same overlay over a base video once as a single ffmpeg encode and
+once per segment count, and reports wall time and speedup. The base needs
+keyframes to split at; pass --gop to re-encode a copy with a keyframe every
+N frames first.
+
+Usage: python bench_segments.py [base_video] [segments ...] [--gop N] [--duration S]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+import ffmpeg_render
+import post
+
+
+def make_keyframed_copy(base_video, gop, out_path):
+    ffmpeg_render.run_ffmpeg([
+        "-i", base_video, "-c:v", "libx264", "-preset", "ultrafast", "-g", gop,
+        "-c:a", "copy", out_path,
+    ])
+    return out_path
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    gop = None
+    duration = 0
+    if "--gop" in args:
+        i = args.index("--gop")
+        gop = int(args[i + 1])
+        del args[i:i + 2]
+    if "--duration" in args:
+        i = args.index("--duration")
+        duration = float(args[i + 1])
+        del args[i:i + 2]
+    base_video = args[0] if args else os.path.join("uploads", "base.mp4")
+    counts = [int(a) for a in args[1:]] or [2, os.cpu_count() or 1]
+
+    work = tempfile.mkdtemp(prefix="bench_segments_")
+    if gop:
+        base_video = make_keyframed_copy(base_video, gop, os.path.join(work, "base_gop.mp4"))
+
+    info = ffmpeg_render.probe_video(base_video)
+    fps = int(round(info["fps"])) or 24
+    keyframes = ffmpeg_render.keyframe_times(base_video)
+    print(f"🎬 {base_video}: {info['size'][0]}x{info['size'][1]}, {info['duration']:.1f}s, "
+          f"{len(keyframes)} keyframes, {os.cpu_count()} CPU core(s)")
+
+    font_path = post.find_font_path() or post.FONT_PATH
+    overlay = post.build_text_overlay(post.load_texts(post.TEXTS_FILE)[0], info["size"], font_path)
+    overlay_png = post._overlay_png_path(overlay, work)
+
+    start = time.perf_counter()
+    ffmpeg_render.render_overlay_video(base_video, overlay_png, overlay.x, overlay.y,
+                                       os.path.join(work, "single.mp4"), fps, duration=duration)
+    single = time.perf_counter() - start
+    print(f"single   : {single:7.2f}s")
+
+    for n in counts:
+        start = time.perf_counter()
+        used = ffmpeg_render.render_overlay_video_segmented(
+            base_video, overlay_png, overlay.x, overlay.y,
+            os.path.join(work, f"segments_{n}.mp4"), fps, duration=duration, segments=n, work_dir=work,
+        )
+        elapsed = time.perf_counter() - start
+        print(f"{n:2d} segs  : {elapsed:7.2f}s  ({used} used)  speedup {single / max(elapsed, 1e-9):.2f}x")
+
+    print(f"📁 Outputs in {work}")
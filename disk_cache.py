@@ -0,0 +1,160 @@
+"""
+Size-capped on-disk caches for render artifacts (overlays, frames, videos...).
+
+Entries are content-addressed files named by a hash of everything that
+affects their content. A hit refreshes the file's mtime, and eviction removes
+the least recently used files once the directory grows past its byte budget.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+# A .tmp file this old belongs to a writer that died (e.g. a killed worker process)
+STALE_TMP_SECONDS = 6 * 3600
+
+
+def make_key(*parts) -> str:
+    """Deterministic sha256 of JSON-serializable parts (tuples/lists/dicts/str/numbers)."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_fingerprint(path: str):
+    """Cheap identity of a file on disk: (absolute path, size, mtime) or None if missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """sha256 of a file's content, for keys that must survive copies/renames of the same bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """One cache directory with a byte budget and LRU eviction."""
+
+    def __init__(self, name: str, directory: str, max_bytes: int):
+        self.name = name
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, key: str, ext: str = "") -> str:
+        return os.path.join(self.directory, key + ext)
+
+    def get(self, key: str, ext: str = ""):
+        """Return the cached file path for key, or None on a miss."""
+        path = self.path_for(key, ext)
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def put(self, key: str, ext: str, write) -> str:
+        """
+        Store a new entry: write(tmp_path) produces the file, which is then moved
+        into place atomically. Returns the final path.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(key, ext)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp{ext}"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: str = None) -> int:
+        """Remove least recently used entries until the cache fits its budget. Returns bytes freed."""
+        with self._lock:
+            entries = []
+            total = 0
+            try:
+                now = time.time()
+                with os.scandir(self.directory) as it:
+                    for entry in it:
+                        if not entry.is_file():
+                            continue
+                        if ".tmp" in entry.name:
+                            try:
+                                if now - entry.stat().st_mtime > STALE_TMP_SECONDS:
+                                    os.remove(entry.path)
+                            except OSError:
+                                pass
+                            continue
+                        st = entry.stat()
+                        entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                        total += st.st_size
+            except OSError:
+                return 0
+
+            freed = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if keep and os.path.abspath(path) == os.path.abspath(keep):
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                freed += size
+                self.evictions += 1
+            self.evicted_bytes += freed
+            return freed
+
+    def stats(self) -> dict:
+        return {
+            "dir": self.directory,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def get_cache(name: str, directory: str, max_bytes: int) -> DiskCache:
+    """Shared DiskCache per directory, so counters survive across renders."""
+    key = os.path.abspath(directory)
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = _CACHES[key] = DiskCache(name, directory, max_bytes)
+        else:
+            cache.max_bytes = int(max_bytes)
+        return cache
+
+
+def all_stats() -> dict:
+    with _CACHES_LOCK:
+        return {cache.name: cache.stats() for cache in _CACHES.values()}
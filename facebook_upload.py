@@ -0,0 +1,224 @@
+"""
+Chunked, resumable Facebook video uploads (Graph API start/transfer/finish).
+
+Instead of one multipart POST of the whole file, an upload session is
+started, the file is streamed from disk in chunks of facebook_upload.chunk_mb
+(bounded by the byte range Graph asks for next), and the session is finished
+with the caption. The session id and the next offset are persisted after
+every chunk in <cache.dir>/uploads/, keyed by page and file content, so
+an upload interrupted by a network error or a crash resumes from the last
+acknowledged byte on the next attempt (the publisher's retry, or a later job
+uploading the same bytes) instead of starting over. Only those transfer
+failures raise ResumableUploadError, the one error worth retrying: the
+session is dropped before finish, so a session is never finished twice.
+sweep_states() removes state files of sessions too old to resume.
+"""
+
+import json
+import os
+import time
+
+import disk_cache
+
+GRAPH_VIDEO_URL = "https://graph-video.facebook.com/v18.0/{page_id}/videos"
+
+
+class FacebookUploadError(RuntimeError):
+    resumable = False  # publisher only retries errors that set this
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class ResumableUploadError(FacebookUploadError):
+    """A chunk transfer failed transiently; the persisted session resumes on the next attempt."""
+
+    resumable = True
+
+
+def _settings(config):
+    upload_cfg = (config or {}).get("facebook_upload") or {}
+    cache_cfg = (config or {}).get("cache") or {}
+    return {
+        "chunked": bool(upload_cfg.get("chunked", True)),
+        "chunk_bytes": max(1, int(float(upload_cfg.get("chunk_mb", 8)) * 1024 * 1024)),
+        "resume_max_age_hours": float(upload_cfg.get("resume_max_age_hours", 6)),
+        "state_dir": os.path.join(cache_cfg.get("dir", ".cache"), "uploads"),
+    }
+
+
+def _graph_post(url, data, files=None, idempotent=False):
+    """POST to Graph through the shared transport; the JSON body, or FacebookUploadError."""
+    import transport
+
+    response = transport.post(url, data=data, files=files, timeout=transport.UPLOAD_TIMEOUT, idempotent=idempotent)
+    try:
+        body = response.json() if response.content else {}
+    except ValueError:
+        body = {}
+    if response.status_code != 200 or "error" in body:
+        message = (body.get("error") or {}).get("message") or response.text[:300]
+        raise FacebookUploadError(f"Graph {data.get('upload_phase', 'upload')} failed: {message}", response.status_code)
+    return body
+
+
+def _state_path(settings, page_id, video_path):
+    # Content, not path: every job renders to its own jobs/<id>/ file, and a
+    # re-run of the same render (render cache) must still find the session
+    key = disk_cache.make_key(
+        "facebook_upload", page_id, os.path.getsize(video_path), disk_cache.file_digest(video_path),
+    )
+    return os.path.join(settings["state_dir"], key + ".json")
+
+
+def _load_state(path, settings):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - state.get("started", 0) > settings["resume_max_age_hours"] * 3600:
+        _drop_state(path)  # Graph upload sessions expire; start a new one
+        return None
+    return state
+
+
+def sweep_states(config=None):
+    """Delete persisted sessions older than resume_max_age_hours (orphans of abandoned uploads). Returns the count."""
+    settings = _settings(config)
+    cutoff = time.time() - settings["resume_max_age_hours"] * 3600
+    removed = 0
+    try:
+        names = os.listdir(settings["state_dir"])
+    except OSError:
+        return 0
+    for name in names:
+        path = os.path.join(settings["state_dir"], name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _save_state(path, state):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _drop_state(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _start(url, access_token, file_size):
+    body = _graph_post(url, {"upload_phase": "start", "file_size": file_size, "access_token": access_token})
+    return {
+        "video_id": body.get("video_id"),
+        "upload_session_id": body["upload_session_id"],
+        "start_offset": int(body["start_offset"]),
+        "end_offset": int(body["end_offset"]),
+        "file_size": file_size,
+        "started": time.time(),
+    }
+
+
+def _transfer_chunk(url, access_token, state, start, chunk):
+    """One transfer POST; network errors and 5xx become ResumableUploadError."""
+    import requests
+
+    try:
+        return _graph_post(
+            url,
+            {
+                "upload_phase": "transfer", "upload_session_id": state["upload_session_id"],
+                "start_offset": start, "access_token": access_token,
+            },
+            files={"video_file_chunk": ("chunk", chunk, "application/octet-stream")},
+            idempotent=True,  # Addressed by start_offset: a repeated chunk is rejected or re-acked, never duplicated
+        )
+    except FacebookUploadError as e:
+        if e.status is not None and e.status < 500:
+            raise
+        raise ResumableUploadError(str(e), e.status) from e
+    except requests.exceptions.RequestException as e:
+        raise ResumableUploadError(f"Graph transfer failed: {e}") from e
+
+
+def _transfer(url, access_token, video_path, state, state_path, chunk_bytes):
+    file_size = state["file_size"]
+    with open(video_path, "rb") as f:
+        while state["start_offset"] < state["end_offset"]:
+            start = state["start_offset"]
+            f.seek(start)
+            chunk = f.read(min(state["end_offset"] - start, chunk_bytes))
+            body = _transfer_chunk(url, access_token, state, start, chunk)
+            state["start_offset"] = int(body["start_offset"])
+            state["end_offset"] = int(body["end_offset"])
+            _save_state(state_path, state)
+            print(f"📤 Facebook upload: {state['start_offset'] / 1024 / 1024:.1f}/{file_size / 1024 / 1024:.1f} MB")
+
+
+def upload_chunked(page_id, access_token, video_path, description, config=None):
+    """
+    Upload video_path to the page through a resumable upload session and
+    return the Graph video id. Resumes a persisted session for the same page
+    and file when there is one.
+    """
+    settings = _settings(config)
+    url = GRAPH_VIDEO_URL.format(page_id=page_id)
+    file_size = os.path.getsize(video_path)
+    state_path = _state_path(settings, page_id, video_path)
+
+    state = _load_state(state_path, settings)
+    if state is not None:
+        print(f"⏯️ Resuming Facebook upload at {state['start_offset'] / 1024 / 1024:.1f} MB")
+        try:
+            _transfer(url, access_token, video_path, state, state_path, settings["chunk_bytes"])
+        except FacebookUploadError as e:
+            if e.resumable:
+                raise
+            # Session rejected (expired/unknown): fall through to a fresh upload
+            print(f"⚠️ Stored Facebook upload session rejected ({e}), starting over")
+            _drop_state(state_path)
+            state = None
+    if state is None:
+        state = _start(url, access_token, file_size)
+        _save_state(state_path, state)
+        _transfer(url, access_token, video_path, state, state_path, settings["chunk_bytes"])
+
+    # Forget the session first: a finish whose reply is lost may still have
+    # published the video, and must not be replayed by a later attempt
+    _drop_state(state_path)
+    body = _graph_post(url, {
+        "upload_phase": "finish", "upload_session_id": state["upload_session_id"],
+        "description": description, "access_token": access_token,
+    })
+    if not body.get("success", True):
+        raise FacebookUploadError(f"Graph finish did not succeed: {body}")
+    return state.get("video_id")
+
+
+def upload_single(page_id, access_token, video_path, description):
+    """Whole file in one multipart POST (facebook_upload.chunked = false); returns the video id."""
+    with open(video_path, "rb") as video_file:
+        body = _graph_post(
+            GRAPH_VIDEO_URL.format(page_id=page_id),
+            {"description": description, "access_token": access_token},
+            files={"file": video_file},
+        )
+    return body.get("id")
+
+
+def upload(page_id, access_token, video_path, description, config=None):
+    if _settings(config)["chunked"]:
+        return upload_chunked(page_id, access_token, video_path, description, config)
+    return upload_single(page_id, access_token, video_path, description)
@@ -0,0 +1,362 @@
+"""
+Direct FFmpeg render path (uses the ffmpeg binary bundled with imageio-ffmpeg).
+
+The text overlay is static, so instead of decoding every frame into Python and
+compositing it in numpy, the overlay PNG is handed to ffmpeg as a second input
+of an `overlay` filter and ffmpeg decodes, composites, trims and encodes in one
+native pipeline. Long bases can also be split at keyframes and encoded by
+several ffmpeg processes in parallel (render_overlay_video_segmented), and
+several renditions can be encoded from one decode (render_overlay_renditions).
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# libx264 settings matching MoviePy's write_videofile defaults
+DEFAULT_VIDEO_ARGS = ["-c:v", "libx264", "-preset", "medium", "-crf", "23", "-pix_fmt", "yuv420p"]
+DEFAULT_AUDIO_ARGS = ["-c:a", "aac", "-b:a", "128k"]
+
+
+class FFmpegError(RuntimeError):
+    pass
+
+
+def get_ffmpeg_exe() -> str:
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+def run_ffmpeg(args, timeout=None, loglevel="error"):
+    """Run ffmpeg with the given arguments; raise FFmpegError with its stderr on failure."""
+    cmd = [get_ffmpeg_exe(), "-hide_banner", "-nostdin", "-loglevel", loglevel, "-y"] + [str(a) for a in args]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+    if proc.returncode != 0:
+        stderr = proc.stderr.decode("utf-8", errors="replace").strip()
+        raise FFmpegError(f"ffmpeg exited with {proc.returncode}: {stderr[-1500:]}")
+    return proc
+
+
+def probe_video(path: str) -> dict:
+    """Return size, fps, duration and audio codec (None if no audio) of a video file."""
+    import imageio_ffmpeg
+    gen = imageio_ffmpeg.read_frames(path)
+    try:
+        meta = next(gen)
+    finally:
+        gen.close()
+    return {
+        "size": tuple(meta["size"]),
+        "fps": float(meta.get("fps") or 0),
+        "duration": float(meta.get("duration") or 0),
+        "audio_codec": meta.get("audio_codec"),
+    }
+
+
+def has_audio_stream(path: str) -> bool:
+    """True if the media file (video or audio-only) has at least one audio stream."""
+    proc = subprocess.run([get_ffmpeg_exe(), "-hide_banner", "-nostdin", "-i", path],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stderr = proc.stderr.decode("utf-8", errors="replace")
+    return re.search(r"Stream #\d+:\d+.*: Audio:", stderr) is not None
+
+
+def color_source_args(size, color, fps, duration):
+    """Input arguments for a solid-color placeholder background."""
+    r, g, b = (int(c) for c in color)
+    return [
+        "-f", "lavfi",
+        "-i", f"color=c=0x{r:02x}{g:02x}{b:02x}:s={int(size[0])}x{int(size[1])}:r={fps}:d={duration}",
+    ]
+
+
+def keyframe_times(path: str, timeout=None):
+    """Presentation times (seconds) of the video keyframes, decoding keyframes only."""
+    proc = run_ffmpeg(
+        ["-skip_frame", "nokey", "-i", path, "-an", "-vf", "showinfo", "-f", "null", "-"],
+        timeout=timeout, loglevel="info",
+    )
+    stderr = proc.stderr.decode("utf-8", errors="replace")
+    return sorted({float(t) for t in re.findall(r"pts_time:([0-9.]+)", stderr)})
+
+
+def plan_segments(keyframes, duration, segments, fps, min_segment_seconds=2.0):
+    """
+    Split [0, duration) into at most `segments` (start, length) pieces that all
+    start on a keyframe (rounded to a frame boundary), as evenly as the
+    keyframes allow. Pieces shorter than min_segment_seconds are merged.
+    """
+    cuts = [0.0]
+    for i in range(1, int(segments)):
+        target = duration * i / segments
+        candidates = [t for t in keyframes if cuts[-1] + min_segment_seconds <= t <= duration - min_segment_seconds]
+        if not candidates:
+            break
+        cut = round(min(candidates, key=lambda t: abs(t - target)) * fps) / fps
+        if cut > cuts[-1]:
+            cuts.append(cut)
+    cuts.append(float(duration))
+    return [(start, end - start) for start, end in zip(cuts, cuts[1:])]
+
+
+def render_overlay_video_segmented(base_video, overlay_png, x, y, output_path, fps, duration=None,
+                                   segments=None, min_segment_seconds=2.0, video_args=None,
+                                   audio_args=None, timeout=None, work_dir=None):
+    """
+    Same output as render_overlay_video, but the timeline is split at keyframes
+    and the pieces are overlaid + encoded by parallel ffmpeg processes, then
+    joined without re-encoding by the concat demuxer (audio is muxed once, from
+    the base, in the join step).
+
+    segments: number of pieces (None/0 = one per CPU core).
+    Returns the number of segments actually used.
+    """
+    info = probe_video(base_video)
+    total = info["duration"]
+    trimmed = bool(duration and 0 < duration < total)
+    if trimmed:
+        total = float(duration)
+    segments = int(segments or os.cpu_count() or 1)
+    plan = plan_segments(keyframe_times(base_video, timeout=timeout), total, segments, fps, min_segment_seconds)
+    if len(plan) < 2:
+        render_overlay_video(base_video, overlay_png, x, y, output_path, fps, duration=duration,
+                             video_args=video_args, audio_args=audio_args, timeout=timeout)
+        return 1
+
+    # Each encoder gets its share of the cores instead of all of them
+    threads = max(1, (os.cpu_count() or 1) // len(plan))
+    if work_dir:
+        os.makedirs(work_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix="segments_", dir=work_dir)
+    try:
+        def encode(index):
+            start, length = plan[index]
+            part = os.path.join(tmp_dir, f"part_{index:03d}.mp4")
+            args = [
+                "-ss", f"{start:.6f}", "-i", base_video,
+                "-loop", "1", "-i", overlay_png,
+                "-filter_complex",
+                f"[0:v]fps={fps}[base];[base][1:v]overlay=x={int(x)}:y={int(y)}:shortest=1:format=auto[v]",
+                "-map", "[v]", "-an",
+            ]
+            if index < len(plan) - 1 or trimmed:
+                # Exact frame count, so boundaries neither drop nor duplicate frames
+                args += ["-frames:v", round((start + length) * fps) - round(start * fps)]
+            run_ffmpeg(args + list(video_args or DEFAULT_VIDEO_ARGS) + ["-threads", threads, part], timeout=timeout)
+            return part
+
+        # ffmpeg does the work in its own processes; threads only wait on them
+        with ThreadPoolExecutor(max_workers=len(plan)) as pool:
+            parts = list(pool.map(encode, range(len(plan))))
+
+        list_path = os.path.join(tmp_dir, "parts.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for part in parts:
+                f.write("file '{}'\n".format(os.path.abspath(part).replace("'", "'\\''")))
+
+        args = ["-f", "concat", "-safe", "0", "-i", list_path]
+        if info.get("audio_codec"):
+            args += ["-t", f"{total:.3f}", "-i", base_video, "-map", "0:v", "-map", "1:a:0"]
+            args += ["-c:v", "copy"] + list(audio_args or DEFAULT_AUDIO_ARGS)
+        else:
+            args += ["-map", "0:v", "-c:v", "copy"]
+        args += ["-movflags", "+faststart", output_path]
+        run_ffmpeg(args, timeout=timeout)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if not os.path.exists(output_path):
+        raise FFmpegError(f"ffmpeg did not create {output_path}")
+    return len(plan)
+
+
+def encode_frames(frames, size, fps, output_path, audio_source=None, duration=None,
+                  video_args=None, audio_args=None, timeout=None, silent_audio=False):
+    """
+    Encode an iterable of HxWx3 uint8 RGB frames piped to ffmpeg as rawvideo,
+    optionally muxing the first audio stream of audio_source (a video or an
+    audio file, padded/trimmed to duration) or, with silent_audio, a silent track.
+    """
+    w, h = int(size[0]), int(size[1])
+    args = ["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{w}x{h}", "-r", str(fps), "-i", "-"]
+    if audio_source and has_audio_stream(audio_source):
+        args += ["-i", audio_source, "-map", "0:v", "-map", "1:a:0"] + list(audio_args or DEFAULT_AUDIO_ARGS)
+        if duration and duration > 0:
+            args += ["-af", "apad"]
+    elif silent_audio:
+        args += ["-f", "lavfi", "-i", "anullsrc=channel_layout=stereo:sample_rate=44100", "-map", "0:v", "-map", "1:a"]
+        args += list(audio_args or DEFAULT_AUDIO_ARGS) + ["-shortest"]
+    if duration and duration > 0:
+        args += ["-t", f"{float(duration):.3f}"]
+    args += list(video_args or DEFAULT_VIDEO_ARGS) + ["-movflags", "+faststart", output_path]
+
+    cmd = [get_ffmpeg_exe(), "-hide_banner", "-nostdin", "-loglevel", "error", "-y"] + [str(a) for a in args]
+    # stderr goes to a temp file: a PIPE nobody reads could fill up and deadlock the encoder
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=err)
+        try:
+            try:
+                for frame in frames:
+                    proc.stdin.write(memoryview(frame).cast("B"))
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass  # ffmpeg exited early; its stderr explains why
+            proc.wait(timeout=timeout)
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            raise
+        if proc.returncode != 0:
+            err.seek(0)
+            stderr = err.read().decode("utf-8", errors="replace").strip()
+            raise FFmpegError(f"ffmpeg exited with {proc.returncode}: {stderr[-1500:]}")
+    return output_path
+
+
+def render_still_video(image_path, output_path, fps, duration, audio_path=None,
+                       video_args=None, audio_args=None, timeout=None):
+    """
+    Encode a single (already composited) image as a video of `duration` seconds.
+
+    The image is decoded and converted to yuv420p once, then cloned for the
+    whole duration inside the filter graph (`-loop 1` would re-decode the PNG
+    for every frame). x264 runs a fast preset with -tune stillimage: the
+    I-frame sets the quality and the identical P-frames are nearly free, so
+    slower presets only burn time on motion search. The audio is audio_path
+    (padded with silence or cut to the duration), or a silent track when no
+    audio is given, since platforms handle video-only files inconsistently.
+    """
+    args = ["-framerate", str(fps), "-i", image_path]
+    if audio_path:
+        args += ["-i", audio_path, "-map", "0:v", "-map", "1:a:0", "-af", "apad"]
+    else:
+        args += ["-f", "lavfi", "-i", "anullsrc=channel_layout=stereo:sample_rate=44100", "-map", "0:v", "-map", "1:a"]
+    args += ["-vf", f"format=yuv420p,tpad=stop_mode=clone:stop_duration={float(duration):.3f}"]
+    args += ["-t", f"{float(duration):.3f}"]
+    args += list(video_args or [
+        "-c:v", "libx264", "-preset", "veryfast", "-tune", "stillimage", "-crf", "23", "-pix_fmt", "yuv420p",
+    ])
+    args += ["-r", str(fps)] + list(audio_args or DEFAULT_AUDIO_ARGS)
+    args += ["-movflags", "+faststart", output_path]
+
+    run_ffmpeg(args, timeout=timeout)
+    if not os.path.exists(output_path):
+        raise FFmpegError(f"ffmpeg did not create {output_path}")
+    return output_path
+
+
+def render_overlay_video(base_video, overlay_png, x, y, output_path, fps, duration=None,
+                         placeholder=None, video_args=None, audio_args=None, timeout=None,
+                         output_size=None, overlay_size=None):
+    """
+    Overlay a static PNG at (x, y) on a video and encode it, entirely inside ffmpeg.
+
+    base_video: source video, or None to render over placeholder=(size, color, duration).
+    duration: trim the output to this many seconds (None/0 = full length).
+    output_size / overlay_size: scale the base / the PNG to these (w, h) before
+    overlaying (draft renders); x, y are then in output pixels.
+    """
+    if base_video:
+        args = ["-i", base_video]
+        has_audio = bool(probe_video(base_video).get("audio_codec"))
+    else:
+        size, color, placeholder_duration = placeholder
+        args = color_source_args(size, color, fps, placeholder_duration)
+        has_audio = False
+
+    args += ["-loop", "1", "-i", overlay_png]
+    base_chain = f"fps={fps}"
+    if output_size:
+        base_chain += f",scale={int(output_size[0])}:{int(output_size[1])}:flags=bilinear"
+    overlay_chain = "null"
+    if overlay_size:
+        overlay_chain = f"scale={int(overlay_size[0])}:{int(overlay_size[1])}:flags=lanczos"
+    args += [
+        "-filter_complex",
+        f"[0:v]{base_chain}[base];[1:v]{overlay_chain}[ov];"
+        f"[base][ov]overlay=x={int(x)}:y={int(y)}:shortest=1:format=auto[v]",
+        "-map", "[v]",
+    ]
+    if has_audio:
+        args += ["-map", "0:a:0"] + list(audio_args or DEFAULT_AUDIO_ARGS)
+    if duration and duration > 0:
+        args += ["-t", f"{float(duration):.3f}"]
+    args += list(video_args or DEFAULT_VIDEO_ARGS)
+    args += ["-movflags", "+faststart", output_path]
+
+    run_ffmpeg(args, timeout=timeout)
+    if not os.path.exists(output_path):
+        raise FFmpegError(f"ffmpeg did not create {output_path}")
+    return output_path
+
+
+def rendition_output_args(profile):
+    """Encoder arguments for one rendition profile (see render_overlay_renditions)."""
+    profile = profile or {}
+    args = [
+        "-c:v", "libx264",
+        "-preset", str(profile.get("preset", "medium")),
+        "-crf", str(profile.get("crf", 23)),
+        "-pix_fmt", "yuv420p",
+    ]
+    if profile.get("max_bitrate"):
+        # Capped CRF: quality-driven, but never above the platform's bitrate limit
+        rate = str(profile["max_bitrate"])
+        args += ["-maxrate", rate, "-bufsize", str(profile.get("bufsize") or rate)]
+    if profile.get("profile"):
+        args += ["-profile:v", str(profile["profile"])]
+    audio = ["-c:a", "aac", "-b:a", str(profile.get("audio_bitrate", "128k"))]
+    if profile.get("audio_rate"):
+        audio += ["-ar", str(profile["audio_rate"])]
+    return args, audio
+
+
+def render_overlay_renditions(base_video, overlay_png, x, y, outputs, fps, duration=None,
+                              placeholder=None, timeout=None):
+    """
+    Encode several renditions of the same overlaid video in one ffmpeg run: the
+    base is decoded and overlaid once, then `split` feeds one encoder per output.
+
+    outputs: list of (output_path, profile) where profile is a dict with optional
+      size [w, h], crf, preset, max_bitrate, bufsize, profile, audio_bitrate,
+      audio_rate, faststart (default True).
+    """
+    if base_video:
+        args = ["-i", base_video]
+        has_audio = bool(probe_video(base_video).get("audio_codec"))
+    else:
+        size, color, placeholder_duration = placeholder
+        args = color_source_args(size, color, fps, placeholder_duration)
+        has_audio = False
+    args += ["-loop", "1", "-i", overlay_png]
+
+    n = len(outputs)
+    graph = [f"[0:v]fps={fps}[base];[base][1:v]overlay=x={int(x)}:y={int(y)}:shortest=1:format=auto,"
+             f"split={n}" + "".join(f"[s{i}]" for i in range(n))]
+    for i, (_, profile) in enumerate(outputs):
+        size = (profile or {}).get("size")
+        if size:
+            graph.append(f"[s{i}]scale={int(size[0])}:{int(size[1])}:flags=bicubic[v{i}]")
+        else:
+            graph.append(f"[s{i}]null[v{i}]")
+    args += ["-filter_complex", ";".join(graph)]
+
+    for i, (output_path, profile) in enumerate(outputs):
+        video_args, audio_args = rendition_output_args(profile)
+        args += ["-map", f"[v{i}]"] + video_args
+        if has_audio:
+            args += ["-map", "0:a:0"] + audio_args
+        if duration and duration > 0:
+            args += ["-t", f"{float(duration):.3f}"]
+        if (profile or {}).get("faststart", True):
+            args += ["-movflags", "+faststart"]
+        args.append(output_path)
+
+    run_ffmpeg(args, timeout=timeout)
+    missing = [path for path, _ in outputs if not os.path.exists(path)]
+    if missing:
+        raise FFmpegError(f"ffmpeg did not create {', '.join(missing)}")
+    return [path for path, _ in outputs]
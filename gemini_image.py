@@ -80,8 +80,138 @@ def generate_image_with_gemini(topic: str, api_key: str, output_path: str = None
         raise RuntimeError(f"Failed to fetch AI image: {str(e)}")
 
 
+def _write_still_with_ffmpeg(img_array, output_path: str, duration: int, fps: int,
+                             audio_path: str = None, config: dict = None):
+    """Still-image engine: save the composited frame once and let ffmpeg loop it."""
+    import tempfile
+    from PIL import Image
+    import ffmpeg_render
+
+    cache_dir = ((config or {}).get("cache") or {}).get("dir", ".cache")
+    tmp_dir = os.path.join(cache_dir, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    fd, frame_path = tempfile.mkstemp(prefix="still_", suffix=".png", dir=tmp_dir)
+    os.close(fd)
+    try:
+        Image.fromarray(img_array).save(frame_path, format="PNG", compress_level=1)
+        ffmpeg_render.render_still_video(frame_path, output_path, fps, duration, audio_path=audio_path)
+    finally:
+        try:
+            os.remove(frame_path)
+        except OSError:
+            pass
+
+
+def _write_still_with_moviepy(img_array, output_path: str, duration: int, fps: int):
+    """MoviePy engine: an ImageClip encoded frame by frame."""
+    try:
+        try:
+            from moviepy.editor import ImageClip
+        except Exception:
+            from moviepy.video.VideoClip import ImageClip
+    except Exception as e:
+        raise RuntimeError(
+            "Missing dependency: moviepy. Install it with: pip install moviepy"
+        ) from e
+
+    # Create video clip from image
+    clip = ImageClip(img_array)
+    
+    # Set duration
+    if hasattr(clip, "set_duration"):
+        clip = clip.set_duration(duration)
+    elif hasattr(clip, "with_duration"):
+        clip = clip.with_duration(duration)
+    
+    # Set fps
+    if hasattr(clip, "set_fps"):
+        clip = clip.set_fps(fps)
+    elif hasattr(clip, "with_fps"):
+        clip = clip.with_fps(fps)
+    
+    try:
+        clip.write_videofile(
+            output_path,
+            codec='libx264',
+            audio_codec='aac',
+            fps=fps,
+            logger=None
+        )
+    finally:
+        try:
+            clip.close()
+        except:
+            pass
+
+
+def ken_burns_boxes(frames: int, src_size, zoom_start: float = 1.0, zoom_end: float = 1.15,
+                    pan_x: float = 0.0, pan_y: float = 0.3):
+    """
+    Per-frame crop boxes (x0, y0, x1, y1) in source pixels, as a (frames, 4) float array.
+
+    Zoom 1.0 shows the whole source; larger values show 1/zoom of it. pan_x/pan_y
+    (-1..1) move the box center across the slack left by the zoom, from -pan/2 to
+    +pan/2 of it. A smoothstep ease keeps the start and end of the motion gentle.
+    """
+    import numpy as np
+
+    src_w, src_h = float(src_size[0]), float(src_size[1])
+    t = np.linspace(0.0, 1.0, max(1, int(frames)))
+    ease = t * t * (3.0 - 2.0 * t)
+    zoom = np.maximum(zoom_start + (zoom_end - zoom_start) * ease, 1.0)
+    box_w, box_h = src_w / zoom, src_h / zoom
+    cx = src_w / 2 + (ease - 0.5) * pan_x * (src_w - box_w)
+    cy = src_h / 2 + (ease - 0.5) * pan_y * (src_h - box_h)
+    x0 = np.clip(cx - box_w / 2, 0.0, src_w - box_w)
+    y0 = np.clip(cy - box_h / 2, 0.0, src_h - box_h)
+    return np.stack([x0, y0, x0 + box_w, y0 + box_h], axis=1)
+
+
+def _ken_burns_frames(src_img, boxes, out_size, blend=None, workers=None):
+    """
+    Yield out_size RGB frames: each box sliced from src_img with a subpixel
+    resize, text blended in its bbox. Frames are produced by a thread pool
+    (PIL releases the GIL while resizing) with a bounded look-ahead, so memory
+    stays at a few frames while x264 encodes in its own process.
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    from PIL import Image
+    import numpy as np
+
+    size = (int(out_size[0]), int(out_size[1]))
+
+    def render(box):
+        # resize(box=...) crops and scales in one C pass; float boxes keep slow pans free of 1px jitter
+        frame = np.asarray(src_img.resize(size, Image.BILINEAR, box=tuple(float(v) for v in box)))
+        return blend(frame) if blend else frame
+
+    workers = max(1, int(workers or os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for box in boxes:
+            pending.append(pool.submit(render, box))
+            if len(pending) > workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _write_motion_with_ffmpeg(src_img, boxes, out_size, output_path: str, fps: int,
+                              blend=None, audio_path: str = None, preset: str = "veryfast"):
+    """Ken Burns engine: frames from the crop schedule piped straight into x264."""
+    import ffmpeg_render
+
+    ffmpeg_render.encode_frames(
+        _ken_burns_frames(src_img, boxes, out_size, blend), out_size, fps, output_path,
+        audio_source=audio_path, duration=len(boxes) / fps, silent_audio=True,
+        video_args=["-c:v", "libx264", "-preset", preset, "-crf", "23", "-pix_fmt", "yuv420p"],
+    )
+
+
 def create_video_from_image(image_path: str, output_path: str = "output.mp4",
-                           duration: int = 12, text: str = "", config: dict = None) -> str:
+                           duration: int = 12, text: str = "", config: dict = None,
+                           audio_path: str = None) -> str:
     """
     Convert a generated image into a short video with optional text overlay.
     
@@ -91,6 +221,10 @@ def create_video_from_image(image_path: str, output_path: str = "output.mp4",
         duration: Video duration in seconds
         text: Optional text overlay
         config: Optional config dict for video/text settings
+        audio_path: Optional audio track (default config["gemini"]["audio_path"], else silence)
+    
+    config["gemini"]["motion"] adds a Ken Burns zoom/pan (effect "ken_burns",
+    the default) or keeps the image static (effect "none").
     
     Returns:
         Path to the generated video file
@@ -98,20 +232,7 @@ def create_video_from_image(image_path: str, output_path: str = "output.mp4",
     if not os.path.exists(image_path):
         raise FileNotFoundError(f"Image not found: {image_path}")
     
-    # Import video libraries
-    try:
-        try:
-            from moviepy.editor import ImageClip, CompositeVideoClip
-        except Exception:
-            from moviepy.video.VideoClip import ImageClip
-            from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
-    except Exception as e:
-        raise RuntimeError(
-            "Missing dependency: moviepy. Install it with: pip install moviepy"
-        ) from e
-    
     from PIL import Image
-    import numpy as np
     
     print(f"🎬 Creating video from image: {image_path}")
     
@@ -120,56 +241,33 @@ def create_video_from_image(image_path: str, output_path: str = "output.mp4",
     target_size = tuple(video_cfg.get("size", [1080, 1920]))
     fps = int(video_cfg.get("fps", 24))
     
-    img = Image.open(image_path)
-    img = img.convert("RGB")
-    
-    # Resize to target size maintaining aspect ratio, then crop/pad
-    img_ratio = img.width / img.height
-    target_ratio = target_size[0] / target_size[1]
-    
-    if img_ratio > target_ratio:
-        # Image is wider - fit height, crop width
-        new_height = target_size[1]
-        new_width = int(new_height * img_ratio)
+    motion_cfg = ((config or {}).get("gemini") or {}).get("motion") or {}
+    motion = str(motion_cfg.get("effect", "ken_burns")).lower() == "ken_burns"
+    zoom_start = float(motion_cfg.get("zoom_start", 1.0))
+    zoom_end = float(motion_cfg.get("zoom_end", 1.15))
+    
+    # Cover-fit + crop via the image ingest (proxy decode, cached by content hash)
+    from ingest import normalized_image
+    if motion:
+        # Oversample so the most zoomed-in box still maps ~1:1 onto output pixels
+        oversample = max(zoom_start, zoom_end, 1.0)
+        src_size = (int(round(target_size[0] * oversample)), int(round(target_size[1] * oversample)))
+        src_img = Image.fromarray(normalized_image(config, image_path, src_size))
+        img_array = None
     else:
-        # Image is taller - fit width, crop height
-        new_width = target_size[0]
-        new_height = int(new_width / img_ratio)
-    
-    img = img.resize((new_width, new_height), Image.LANCZOS)
-    
-    # Center crop to target size
-    left = (new_width - target_size[0]) // 2
-    top = (new_height - target_size[1]) // 2
-    img = img.crop((left, top, left + target_size[0], top + target_size[1]))
-    
-    img_array = np.array(img)
-    
-    # Create video clip from image
-    clip = ImageClip(img_array)
-    
-    # Set duration
-    if hasattr(clip, "set_duration"):
-        clip = clip.set_duration(duration)
-    elif hasattr(clip, "with_duration"):
-        clip = clip.with_duration(duration)
-    
-    # Set fps
-    if hasattr(clip, "set_fps"):
-        clip = clip.set_fps(fps)
-    elif hasattr(clip, "with_fps"):
-        clip = clip.with_fps(fps)
+        img_array = normalized_image(config, image_path, target_size)
     
     # Add text overlay if provided
+    blend = None
     if text and text.strip():
-        from post import create_text_image
+        from post import create_text_overlay, make_overlay_blender
         text_cfg = (config or {}).get("text_overlay", {})
         
         # Get font settings from config
+        from post import select_font_for_text, get_overlay_cache, FONT_PATH
         font_path = text_cfg.get("font_path", "")
-        if not font_path or not os.path.exists(font_path):
-            from post import find_font_path, FONT_PATH
-            font_path = find_font_path() or FONT_PATH
+        preferred_font = font_path if font_path and os.path.exists(font_path) else None
+        font_path = select_font_for_text(text, preferred=preferred_font) or FONT_PATH
         
         font_size = int(text_cfg.get("font_size", 45))
         min_font_size = int(text_cfg.get("min_font_size", 38))
@@ -186,21 +284,19 @@ def create_video_from_image(image_path: str, output_path: str = "output.mp4",
         # Position at bottom for better readability over image
         pos = (target_size[0] // 2, int(target_size[1] * 0.78))
         
-        txt_img_array = create_text_image(
+        overlay = create_text_overlay(
             text, target_size, font_path, font_size, color,
             shadow_color=shadow_color, shadow_offset=shadow_offset,
             max_width_pct=max_width_pct, max_height_pct=max_height_pct,
             line_spacing_px=line_spacing_px, align=align,
             position=pos, min_font_size=min_font_size,
+            cache=get_overlay_cache(config),
         )
         
-        txt_clip = ImageClip(txt_img_array)
-        if hasattr(txt_clip, "set_duration"):
-            txt_clip = txt_clip.set_duration(duration)
-        elif hasattr(txt_clip, "with_duration"):
-            txt_clip = txt_clip.with_duration(duration)
-        
-        clip = CompositeVideoClip([clip, txt_clip])
+        blend = make_overlay_blender(overlay)
+        if img_array is not None:
+            # The image is static: blend the text in once instead of compositing every frame
+            img_array = blend(img_array)
     
     # Export video
     print(f"💾 Exporting video to: {output_path}")
@@ -209,32 +305,50 @@ def create_video_from_image(image_path: str, output_path: str = "output.mp4",
     if output_dir and output_dir != "." and not os.path.exists(output_dir):
         os.makedirs(output_dir, exist_ok=True)
     
-    try:
-        clip.write_videofile(
-            output_path,
-            codec='libx264',
-            audio_codec='aac',
-            fps=fps,
-            logger=None
-        )
-        
-        if not os.path.exists(output_path):
-            raise RuntimeError(f"Video file was not created: {output_path}")
-        
-        file_size = os.path.getsize(output_path)
-        print(f"✅ Video created! Size: {file_size / 1024 / 1024:.2f} MB")
-    finally:
+    if audio_path is None:
+        audio_path = ((config or {}).get("gemini") or {}).get("audio_path") or None
+    if audio_path and not os.path.exists(audio_path):
+        print(f"⚠️ Audio file not found, using silence: {audio_path}")
+        audio_path = None
+
+    # Same engine switch as post.generate_video: ffmpeg, moviepy, or auto (ffmpeg with MoviePy fallback)
+    engine = str(video_cfg.get("engine", "auto")).lower()
+    rendered = False
+    if engine in ("auto", "ffmpeg"):
         try:
-            clip.close()
-        except:
-            pass
+            if motion:
+                boxes = ken_burns_boxes(
+                    int(round(duration * fps)), src_img.size, zoom_start, zoom_end,
+                    pan_x=float(motion_cfg.get("pan_x", 0.0)), pan_y=float(motion_cfg.get("pan_y", 0.3)),
+                )
+                _write_motion_with_ffmpeg(src_img, boxes, target_size, output_path, fps, blend,
+                                          audio_path, preset=str(motion_cfg.get("preset", "veryfast")))
+            else:
+                _write_still_with_ffmpeg(img_array, output_path, duration, fps, audio_path, config)
+            rendered = True
+        except Exception as e:
+            if engine == "ffmpeg":
+                raise
+            print(f"⚠️ FFmpeg image encode failed, falling back to a static MoviePy render: {e}")
+    if not rendered:
+        if img_array is None:
+            img_array = normalized_image(config, image_path, target_size)
+            if blend:
+                img_array = blend(img_array)
+        _write_still_with_moviepy(img_array, output_path, duration, fps)
+    
+    if not os.path.exists(output_path):
+        raise RuntimeError(f"Video file was not created: {output_path}")
+    
+    file_size = os.path.getsize(output_path)
+    print(f"✅ Video created! Size: {file_size / 1024 / 1024:.2f} MB")
     
     return output_path
 
 
 def generate_and_upload_to_youtube(topic: str, config: dict, 
                                    title: str = None, description: str = None,
-                                   add_text_overlay: bool = True) -> dict:
+                                   add_text_overlay: bool = True, targets: list = None) -> dict:
     """
     Complete flow: Generate image with Gemini → Create video → Upload to YouTube.
     
@@ -244,11 +358,16 @@ def generate_and_upload_to_youtube(topic: str, config: dict,
         title: Custom title (default: auto-generated from topic)
         description: Custom description (default: auto-generated from topic)
         add_text_overlay: Whether to add text on the video
+        targets: Publish targets, uploaded concurrently (default: ["youtube"])
     
     Returns:
-        dict with keys: image_path, video_path, youtube_video_id
+        dict with keys: image_path, video_path, youtube_video_id, publish (per-target results)
+    
+    Raises:
+        RuntimeError: if the YouTube upload (when requested) or every target failed
     """
-    import youtube as yt
+    import publisher
+    import render_pool
     
     gemini_cfg = config.get("gemini", {})
     style_prompt = gemini_cfg.get("image_style", "")
@@ -257,6 +376,7 @@ def generate_and_upload_to_youtube(topic: str, config: dict,
         "image_path": None,
         "video_path": None,
         "youtube_video_id": None,
+        "publish": {},
     }
     
     # Step 1: Generate image
@@ -274,17 +394,18 @@ def generate_and_upload_to_youtube(topic: str, config: dict,
     output_video = (config.get("paths", {}).get("output_video", "output.mp4"))
     duration = int(config.get("video", {}).get("max_duration_seconds", 12))
     
-    video_path = create_video_from_image(
+    # Compositing runs in a render worker process, not in the web server
+    video_path = render_pool.submit(config, create_video_from_image, kwargs=dict(
         image_path=image_path,
         output_path=output_video,
         duration=duration,
         text=topic if add_text_overlay else "",
         config=config
-    )
+    )).result()
     result["video_path"] = video_path
     
-    # Step 3: Upload to YouTube
-    print("📺 Step 3: Uploading to YouTube...")
+    # Step 3: Upload (YouTube, plus any extra targets, concurrently)
+    print("📺 Step 3: Uploading...")
     
     # Auto-generate title and description if not provided
     if not title:
@@ -292,15 +413,18 @@ def generate_and_upload_to_youtube(topic: str, config: dict,
     if not description:
         description = f"{topic}\n\n#shorts #motivation #quotes #تحفيز #حكم"
     
-    video_id = yt.upload_video(
-        title=title,
-        description=description,
-        file_path=video_path,
-        config=config
+    result["publish"] = publisher.publish(
+        config, video_path, topic, targets=targets or ["youtube"], title=title, description=description,
     )
+    youtube_result = result["publish"].get("youtube") or {}
+    video_id = youtube_result.get("result")
     result["youtube_video_id"] = video_id
     
     print("=" * 50)
+    failed = {target: r["error"] for target, r in result["publish"].items() if not r["ok"]}
+    if "youtube" in failed or len(failed) == len(result["publish"]):
+        errors = "; ".join(f"{target}: {error}" for target, error in failed.items())
+        raise RuntimeError(f"Publishing failed ({errors or 'no targets'})")
     if video_id:
         print(f"🎉 Success! YouTube Video ID: {video_id}")
         print(f"🔗 URL: https://youtube.com/shorts/{video_id}")
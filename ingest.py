@@ -0,0 +1,248 @@
+"""
+Base-video ingest: transcode an uploaded base once into a normalized
+"mezzanine" file (configured size and fps, trimmed to max_duration_seconds,
+loudness-normalized audio, a keyframe every second), so daily renders never
+pay for scaling, resampling or decoding odd codecs.
+
+Mezzanines live in a disk cache keyed by the source fingerprint and the
+normalization settings, so changing video.size/fps/max_duration_seconds or
+replacing the base simply produces a new one.
+
+Still images (generated/downloaded pictures) get the same treatment through
+normalized_image: a cheap proxy decode, cropped then scaled to the frame
+size, cached by content hash.
+"""
+
+import functools
+import math
+import os
+import threading
+import time
+
+import disk_cache
+
+INGEST_VERSION = 1  # Bump when the transcode settings change, to invalidate mezzanines
+IMAGE_INGEST_VERSION = 1  # Bump when _load_cover_image changes, to invalidate normalized images
+
+_JOBS = {}  # key -> {"state", "source", "path", "error", "started", "finished", "event"}
+_JOBS_LOCK = threading.Lock()
+
+# False in render worker processes: ingest jobs belong to the web server, so a
+# worker only ever uses a finished mezzanine and never starts a transcode itself
+BACKGROUND_INGEST = True
+
+
+def _settings(config):
+    video_cfg = (config or {}).get("video") or {}
+    ingest_cfg = (config or {}).get("ingest") or {}
+    return {
+        "size": [int(v) for v in video_cfg.get("size", [1080, 1920])],
+        "fps": int(video_cfg.get("fps", 24)),
+        "max_duration_seconds": int(video_cfg.get("max_duration_seconds", 15)),
+        "loudnorm": ingest_cfg.get("loudnorm", "I=-16:TP=-1.5:LRA=11"),
+        "crf": int(ingest_cfg.get("crf", 18)),
+        "preset": ingest_cfg.get("preset", "veryfast"),
+    }
+
+
+def _cache(config):
+    cache_cfg = (config or {}).get("cache") or {}
+    ingest_cfg = (config or {}).get("ingest") or {}
+    directory = os.path.join(cache_cfg.get("dir", ".cache"), "mezzanine")
+    return disk_cache.get_cache("mezzanine", directory, int(ingest_cfg.get("max_mb", 2048)) * 1024 * 1024)
+
+
+def mezzanine_key(config, source):
+    fingerprint = disk_cache.file_fingerprint(source)
+    if fingerprint is None:
+        return None
+    return disk_cache.make_key("mezzanine", INGEST_VERSION, fingerprint, _settings(config))
+
+
+def _transcode(source, output_path, settings, timeout=None):
+    import ffmpeg_render
+
+    w, h = settings["size"]
+    fps = settings["fps"]
+    # Fill the frame (cover) and center-crop, so any aspect ratio ends up exactly w x h
+    vf = (f"scale={w}:{h}:force_original_aspect_ratio=increase:flags=bicubic,"
+          f"crop={w}:{h},setsar=1,fps={fps},format=yuv420p")
+    args = ["-i", source]
+    if settings["max_duration_seconds"] > 0:
+        args += ["-t", settings["max_duration_seconds"]]
+    args += [
+        "-map", "0:v:0", "-vf", vf,
+        "-c:v", "libx264", "-preset", settings["preset"], "-crf", settings["crf"],
+        "-g", fps, "-keyint_min", fps,
+    ]
+    if ffmpeg_render.probe_video(source).get("audio_codec"):
+        args += ["-map", "0:a:0"]
+        if settings["loudnorm"]:
+            args += ["-af", f"loudnorm={settings['loudnorm']}"]
+        args += ["-c:a", "aac", "-b:a", "192k", "-ar", "48000", "-ac", "2"]
+    args += ["-movflags", "+faststart", output_path]
+    ffmpeg_render.run_ffmpeg(args, timeout=timeout)
+
+
+def ingest(config, source):
+    """Transcode source into its mezzanine (blocking) and return the mezzanine path."""
+    key = mezzanine_key(config, source)
+    if key is None:
+        raise FileNotFoundError(f"Base video not found: {source}")
+    cache = _cache(config)
+    cached = cache.get(key, ".mp4")
+    if cached:
+        return cached
+
+    settings = _settings(config)
+    print(f"📥 Ingesting base video {source} → {settings['size'][0]}x{settings['size'][1]} @ {settings['fps']}fps...")
+    start = time.perf_counter()
+    path = cache.put(key, ".mp4", lambda tmp: _transcode(source, tmp, settings))
+    print(f"✅ Base video ingested in {time.perf_counter() - start:.1f}s: {path}")
+    return path
+
+
+def start_ingest(config, source):
+    """Ingest source in a background thread (no-op if already done or running). Returns the job key."""
+    key = mezzanine_key(config, source)
+    if key is None:
+        return None
+    with _JOBS_LOCK:
+        job = _JOBS.get(key)
+        if job and job["state"] in ("running", "done"):
+            return key
+        job = _JOBS[key] = {
+            "state": "running", "source": source, "path": None, "error": None,
+            "started": time.time(), "finished": None, "event": threading.Event(),
+        }
+
+    def run():
+        try:
+            job["path"] = ingest(config, source)
+            job["state"] = "done"
+        except Exception as e:
+            print(f"❌ Base video ingest failed: {e}")
+            job["error"] = str(e)
+            job["state"] = "failed"
+        finally:
+            job["finished"] = time.time()
+            job["event"].set()
+
+    threading.Thread(target=run, name="base-ingest", daemon=True).start()
+    return key
+
+
+def resolve_base_video(config, source, wait_seconds=None):
+    """
+    Path renders should read: the mezzanine of source when it is ready (waiting
+    up to wait_seconds for a running ingest), else source itself, in which case
+    an ingest is started in the background for the next render.
+    """
+    if not ((config or {}).get("ingest") or {}).get("enabled", True):
+        return source
+    key = mezzanine_key(config, source)
+    if key is None:
+        return source
+    cached = _cache(config).get(key, ".mp4")
+    if cached:
+        return cached
+    if not BACKGROUND_INGEST:
+        return source
+
+    with _JOBS_LOCK:
+        job = _JOBS.get(key)
+    if job and job["state"] == "running":
+        if wait_seconds is None:
+            wait_seconds = float(((config or {}).get("ingest") or {}).get("wait_seconds", 120))
+        if wait_seconds > 0:
+            print("⏳ Waiting for the base video ingest to finish...")
+            job["event"].wait(wait_seconds)
+        if job["state"] == "done" and job["path"] and os.path.exists(job["path"]):
+            return job["path"]
+    elif not job or job["state"] != "failed":
+        print("ℹ️ No normalized base yet; rendering from the original and ingesting in the background.")
+        start_ingest(config, source)
+    return source
+
+
+def status(config, source):
+    """Ingest state of source: ready / running / failed / missing, plus the mezzanine path."""
+    key = mezzanine_key(config, source)
+    if key is None:
+        return {"state": "missing", "source": source}
+    cached = _cache(config).path_for(key, ".mp4")
+    if os.path.exists(cached):
+        return {"state": "ready", "source": source, "path": cached}
+    with _JOBS_LOCK:
+        job = dict(_JOBS.get(key) or {})
+    job.pop("event", None)
+    if not job:
+        return {"state": "pending", "source": source}
+    return job
+
+
+def _load_cover_image(image_path, size):
+    """
+    Decode image_path cover-fitted and center-cropped to exactly size (w, h),
+    touching as few pixels as possible: JPEG draft mode lets the decoder scale
+    by 1/2..1/8 in the DCT domain, only the visible crop is kept, Image.reduce
+    does the cheap integer part of the downscale, and a single LANCZOS resize
+    of the (float) crop box does the rest.
+    """
+    from PIL import Image
+
+    tw, th = int(size[0]), int(size[1])
+    img = Image.open(image_path)
+    src_w, src_h = img.size
+    scale = max(tw / src_w, th / src_h)
+    crop_w, crop_h = tw / scale, th / scale
+    box = ((src_w - crop_w) / 2, (src_h - crop_h) / 2, (src_w + crop_w) / 2, (src_h + crop_h) / 2)
+
+    if img.format == "JPEG":
+        # Largest DCT scale that still leaves the crop at least size pixels
+        img.draft("RGB", (math.ceil(src_w * scale), math.ceil(src_h * scale)))
+        fx, fy = img.size[0] / src_w, img.size[1] / src_h
+        box = (box[0] * fx, box[1] * fy, box[2] * fx, box[3] * fy)
+    img = img.convert("RGB")
+
+    # Crop before scaling: only the visible region is resampled
+    int_box = (
+        max(0, math.floor(box[0])), max(0, math.floor(box[1])),
+        min(img.width, math.ceil(box[2])), min(img.height, math.ceil(box[3])),
+    )
+    img = img.crop(int_box)
+    box = (box[0] - int_box[0], box[1] - int_box[1], box[2] - int_box[0], box[3] - int_box[1])
+
+    factor = int(min((box[2] - box[0]) / tw, (box[3] - box[1]) / th))
+    if factor >= 2:
+        img = img.reduce(factor)
+        box = tuple(v / factor for v in box)
+    return img.resize((tw, th), Image.LANCZOS, box=box)
+
+
+@functools.lru_cache(maxsize=256)
+def _content_digest(path, size, mtime_ns):
+    # size/mtime are part of the cache key, so an edited file is hashed again
+    return disk_cache.file_digest(path)
+
+
+def normalized_image(config, image_path, size):
+    """
+    (h, w, 3) uint8 RGB array of image_path cover-fitted to size, memory-mapped
+    from the cache. Keyed by the source's content hash, so repeated videos from
+    the same image skip decoding entirely.
+    """
+    import numpy as np
+
+    cache_cfg = (config or {}).get("cache") or {}
+    cache = disk_cache.get_cache(
+        "images", os.path.join(cache_cfg.get("dir", ".cache"), "images"),
+        int(cache_cfg.get("images_max_mb", 512)) * 1024 * 1024,
+    )
+    st = os.stat(image_path)
+    digest = _content_digest(os.path.abspath(image_path), st.st_size, st.st_mtime_ns)
+    key = disk_cache.make_key("image", IMAGE_INGEST_VERSION, digest, [int(size[0]), int(size[1])])
+    path = cache.get(key, ".npy")
+    if path is None:
+        path = cache.put(key, ".npy", lambda tmp: np.save(tmp, np.asarray(_load_cover_image(image_path, size))))
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,204 @@
+"""
+Disk janitor for generated artifacts.
+
+Three artifact classes grow without bound on a long-running instance:
+images (uploads/ai_image_<ts>.png from the image flow), renders (job
+directories of scheduled/run_now/test/YouTube runs) and previews (job
+directories of /preview). A background thread sweeps them every
+janitor.interval_minutes: per class, anything older than max_age_hours goes,
+then the least recently used items are evicted until the class fits max_mb.
+
+Protected items are never removed: the active base video, jobs still
+running, the artifact /download_last would serve, and anything touched in
+the last grace_minutes (an image a running flow is about to use).
+
+Each pass also drops resumable Facebook upload sessions too old to resume
+(facebook_upload.sweep_states).
+"""
+
+import fnmatch
+import os
+import threading
+import time
+
+import jobs
+
+CLASSES = ("images", "renders", "previews")
+DEFAULTS = {
+    "images": {"max_mb": 200, "max_age_hours": 72},
+    "renders": {"max_mb": 1024, "max_age_hours": 72},
+    "previews": {"max_mb": 256, "max_age_hours": 12},
+}
+
+_STATS = {
+    "runs": 0, "last_run": None, "removed": 0, "reclaimed_bytes": 0,
+    "classes": {name: {"removed": 0, "reclaimed_bytes": 0, "bytes": 0, "items": 0} for name in CLASSES},
+}
+_STATS_LOCK = threading.Lock()
+_SWEEP_LOCK = threading.Lock()
+_THREAD = None
+
+
+def _settings(config):
+    janitor_cfg = (config or {}).get("janitor") or {}
+    settings = {
+        "enabled": bool(janitor_cfg.get("enabled", True)),
+        "interval_minutes": float(janitor_cfg.get("interval_minutes", 30)),
+        "grace_minutes": float(janitor_cfg.get("grace_minutes", 10)),
+        "image_patterns": list(janitor_cfg.get("image_patterns", ["ai_image_*.png"])),
+    }
+    for name in CLASSES:
+        cls_cfg = janitor_cfg.get(name) or {}
+        settings[name] = {
+            "max_bytes": int(float(cls_cfg.get("max_mb", DEFAULTS[name]["max_mb"])) * 1024 * 1024),
+            "max_age_hours": float(cls_cfg.get("max_age_hours", DEFAULTS[name]["max_age_hours"])),
+        }
+    return settings
+
+
+def _usage(path):
+    """(bytes, last used) of a file, or of a directory's files (newest mtime wins)."""
+    if os.path.isfile(path):
+        st = os.stat(path)
+        return st.st_size, st.st_mtime
+    total, last = 0, None
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                st = os.stat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            total += st.st_size
+            last = st.st_mtime if last is None else max(last, st.st_mtime)
+    return total, os.path.getmtime(path) if last is None else last
+
+
+def _collect(config, settings):
+    """{class: [(path, bytes, last_used)]} of every removable candidate on disk."""
+    items = {name: [] for name in CLASSES}
+
+    uploads_dir = ((config or {}).get("paths") or {}).get("uploads_dir", "uploads")
+    try:
+        names = os.listdir(uploads_dir)
+    except OSError:
+        names = []
+    for name in names:
+        if any(fnmatch.fnmatch(name, pattern) for pattern in settings["image_patterns"]):
+            path = os.path.join(uploads_dir, name)
+            if os.path.isfile(path):
+                items["images"].append((path, *_usage(path)))
+
+    for manifest in jobs.list_jobs(config):
+        if manifest.get("state") == "running":
+            continue
+        cls = "previews" if manifest.get("kind") == "preview" else "renders"
+        try:
+            items[cls].append((manifest["dir"], *_usage(manifest["dir"])))
+        except OSError:
+            continue
+    return items
+
+
+def _protected(config):
+    paths = (config or {}).get("paths") or {}
+    protected = {os.path.abspath(paths.get("base_video", "base.mp4"))}
+    latest = jobs.latest_artifact(config)
+    if latest:
+        protected.add(os.path.abspath(os.path.dirname(latest)))
+    protected.update(os.path.abspath(job_dir) for job_dir in jobs.active_dirs())
+    return protected
+
+
+def _remove(path):
+    import shutil
+
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return not os.path.exists(path)
+
+
+def sweep(config, log=print):
+    """
+    One janitor pass over every artifact class: age limit first, then LRU
+    eviction down to the byte budget. Returns {class: reclaimed bytes}.
+    """
+    settings = _settings(config)
+    now = time.time()
+    grace = settings["grace_minutes"] * 60
+    reclaimed = {}
+    with _SWEEP_LOCK:
+        protected = _protected(config)
+        for cls, candidates in _collect(config, settings).items():
+            limits = settings[cls]
+            cutoff = now - limits["max_age_hours"] * 3600 if limits["max_age_hours"] > 0 else None
+            total = sum(size for _, size, _ in candidates)
+            removed = freed = 0
+            # Oldest first: expired items go regardless of budget, then LRU until under max_bytes
+            for path, size, last_used in sorted(candidates, key=lambda item: item[2]):
+                expired = cutoff is not None and last_used < cutoff
+                if not expired and total <= limits["max_bytes"]:
+                    break
+                if os.path.abspath(path) in protected or now - last_used < grace:
+                    continue
+                if _remove(path):
+                    total -= size
+                    freed += size
+                    removed += 1
+            reclaimed[cls] = freed
+            with _STATS_LOCK:
+                cls_stats = _STATS["classes"][cls]
+                cls_stats["removed"] += removed
+                cls_stats["reclaimed_bytes"] += freed
+                cls_stats["bytes"] = total
+                cls_stats["items"] = len(candidates) - removed
+                _STATS["removed"] += removed
+                _STATS["reclaimed_bytes"] += freed
+            if removed:
+                log(f"🧹 Janitor: removed {removed} {cls} item(s), reclaimed {freed / 1024 / 1024:.1f} MB "
+                    f"({total / 1024 / 1024:.1f} MB left)")
+        import facebook_upload
+        stale_sessions = facebook_upload.sweep_states(config)
+        if stale_sessions:
+            log(f"🧹 Janitor: removed {stale_sessions} expired Facebook upload session(s)")
+        with _STATS_LOCK:
+            _STATS["runs"] += 1
+            _STATS["last_run"] = now
+    return reclaimed
+
+
+def stats():
+    """Janitor counters (exposed by /render_metrics)."""
+    with _STATS_LOCK:
+        return {**_STATS, "classes": {name: dict(values) for name, values in _STATS["classes"].items()}}
+
+
+def start(load_config, log=print):
+    """
+    Run sweep() in a daemon thread every janitor.interval_minutes, reading the
+    config fresh each time (load_config is a callable). No-op if already running.
+    """
+    global _THREAD
+    if _THREAD is not None and _THREAD.is_alive():
+        return _THREAD
+
+    def run():
+        while True:
+            interval = 30.0
+            try:
+                config = load_config()
+                settings = _settings(config)
+                interval = settings["interval_minutes"]
+                if settings["enabled"]:
+                    sweep(config, log=log)
+            except Exception as e:
+                log(f"⚠️ Janitor sweep failed: {e}")
+            time.sleep(max(1.0, interval * 60))
+
+    _THREAD = threading.Thread(target=run, name="janitor", daemon=True)
+    _THREAD.start()
+    return _THREAD
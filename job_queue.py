@@ -0,0 +1,219 @@
+"""
+Bounded, priority-aware job queue with a small worker pool.
+
+Renders are memory hungry, so background work (scheduled posts, /run_now,
+/test_scheduled_job, the YouTube + Gemini flow) is submitted here instead of
+each request starting its own thread. At most queue.workers jobs run at once,
+at most queue.max_queued wait (submit raises QueueFull past that), lower
+priority numbers run first, and a job is only started once the machine has
+queue.job_memory_mb of memory available (admission control); with nothing
+running the next job is always admitted, so a small box still makes progress.
+job_memory_mb defaults to a share of the machine's MemTotal, so the same
+defaults hold on a 512 MB instance and on a large one.
+
+Every job gets an id and a state (queued / running / done / failed) that
+/jobs/<id> reports. The id is also used for the job's output directory
+(see jobs.new_job), so /jobs/<id> and /download_last?job=<id> agree.
+"""
+
+import itertools
+import queue
+import threading
+import time
+import uuid
+
+PRIORITY_HIGH = 0  # scheduled posts
+PRIORITY_NORMAL = 5  # user-triggered runs
+PRIORITY_LOW = 9  # tests
+
+ASSUMED_TOTAL_MEMORY_MB = 512  # The smallest supported instance, when MemTotal is unknown
+JOB_MEMORY_FRACTION = 0.3
+
+
+def total_memory_mb():
+    """MemTotal in MB (psutil if installed, else /proc/meminfo); None when unknown."""
+    try:
+        import psutil
+        return psutil.virtual_memory().total / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def memory_share_mb(fraction):
+    """fraction of the machine's memory in MB (of ASSUMED_TOTAL_MEMORY_MB when unknown)."""
+    return int((total_memory_mb() or ASSUMED_TOTAL_MEMORY_MB) * fraction)
+
+
+_SETTINGS = {
+    "workers": 1, "max_queued": 10, "job_memory_mb": memory_share_mb(JOB_MEMORY_FRACTION),
+    "settle_seconds": 20, "keep_history": 200,
+}
+_QUEUE = queue.PriorityQueue()
+_SEQ = itertools.count()
+_JOBS = {}  # id -> record (see submit)
+_JOBS_LOCK = threading.Lock()
+_WORKERS = []
+_LOCAL = threading.local()
+
+
+class QueueFull(Exception):
+    """Raised by submit() when queue.max_queued jobs are already waiting."""
+
+
+def configure(config):
+    """Apply the queue section of config (worker count only grows while running)."""
+    queue_cfg = (config or {}).get("queue") or {}
+    with _JOBS_LOCK:
+        for name in ("workers", "max_queued", "job_memory_mb", "settle_seconds", "keep_history"):
+            if queue_cfg.get(name) is not None:
+                _SETTINGS[name] = max(0, int(queue_cfg[name]))
+        _SETTINGS["workers"] = max(1, _SETTINGS["workers"])
+    _start_workers()
+
+
+def current_job_id():
+    """Id of the queued job running in this thread, or None outside the queue."""
+    return getattr(_LOCAL, "job_id", None)
+
+
+def available_memory_mb():
+    """MemAvailable in MB (psutil if installed, else /proc/meminfo); None when unknown."""
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _public(record):
+    return {k: v for k, v in record.items() if k not in ("fn", "args", "kwargs")}
+
+
+def submit(fn, kind, priority=PRIORITY_NORMAL, memory_mb=None, args=(), kwargs=None):
+    """
+    Queue fn(*args, **kwargs) and return the job record (a copy). Raises
+    QueueFull when the queue is at capacity.
+    """
+    _start_workers()
+    with _JOBS_LOCK:
+        waiting = sum(1 for r in _JOBS.values() if r["state"] == "queued")
+        if waiting >= _SETTINGS["max_queued"]:
+            raise QueueFull(f"{waiting} jobs already queued")
+        job_id = f"{time.strftime('%Y%m%d-%H%M%S')}_{kind}_{uuid.uuid4().hex[:6]}"
+        record = _JOBS[job_id] = {
+            "id": job_id, "kind": kind, "priority": int(priority), "state": "queued",
+            "memory_mb": int(memory_mb if memory_mb is not None else _SETTINGS["job_memory_mb"]),
+            "submitted": time.time(), "started": None, "finished": None, "error": None,
+            "fn": fn, "args": tuple(args), "kwargs": dict(kwargs or {}),
+        }
+        _trim_history()
+        print(f"📥 Job {job_id} queued (priority {priority}, position {waiting + 1})")
+        _QUEUE.put((record["priority"], next(_SEQ), job_id))
+    return _public(record)
+
+
+def get(job_id):
+    with _JOBS_LOCK:
+        record = _JOBS.get(job_id)
+        return _public(record) if record else None
+
+
+def list_jobs():
+    """All known jobs, newest first."""
+    with _JOBS_LOCK:
+        records = [_public(r) for r in _JOBS.values()]
+    return sorted(records, key=lambda r: r["submitted"], reverse=True)
+
+
+def stats():
+    with _JOBS_LOCK:
+        states = {}
+        for record in _JOBS.values():
+            states[record["state"]] = states.get(record["state"], 0) + 1
+        settings = dict(_SETTINGS)
+    return {"settings": settings, "states": states, "available_memory_mb": available_memory_mb()}
+
+
+def _trim_history():
+    finished = [r for r in _JOBS.values() if r["state"] in ("done", "failed")]
+    excess = len(_JOBS) - _SETTINGS["keep_history"]
+    for record in sorted(finished, key=lambda r: r["finished"])[:max(0, excess)]:
+        del _JOBS[record["id"]]
+
+
+def _admit(record):
+    """True if record may start now: enough free memory, or nothing else running."""
+    with _JOBS_LOCK:
+        running = [r for r in _JOBS.values() if r["state"] == "running"]
+        settle = _SETTINGS["settle_seconds"]
+    if not running:
+        return True
+    available = available_memory_mb()
+    if available is None:
+        return True
+    # Jobs that started recently have not reached their peak memory yet: reserve it for them
+    now = time.time()
+    reserved = sum(r["memory_mb"] for r in running if now - r["started"] < settle)
+    return available - reserved >= record["memory_mb"]
+
+
+def _run(record):
+    with _JOBS_LOCK:
+        record["state"] = "running"
+        record["started"] = time.time()
+    print(f"▶️ Job {record['id']} started")
+    _LOCAL.job_id = record["id"]
+    try:
+        record["fn"](*record["args"], **record["kwargs"])
+        state, error = "done", None
+    except Exception as e:
+        print(f"❌ Job {record['id']} failed: {e}")
+        state, error = "failed", str(e)
+    finally:
+        _LOCAL.job_id = None
+    with _JOBS_LOCK:
+        record.update(state=state, error=error, finished=time.time())
+        record.pop("args", None)
+        record.pop("kwargs", None)
+    print(f"{'✅' if state == 'done' else '⚠️'} Job {record['id']} {state} in {record['finished'] - record['started']:.1f}s")
+
+
+def _worker():
+    while True:
+        priority, seq, job_id = _QUEUE.get()
+        with _JOBS_LOCK:
+            record = _JOBS.get(job_id)
+        if record is None or record["state"] != "queued":
+            continue
+        waited = False
+        while not _admit(record):
+            if not waited:
+                print(f"⏳ Job {job_id} waiting for memory ({record['memory_mb']} MB needed)")
+                waited = True
+            time.sleep(2)
+        _run(record)
+
+
+def _start_workers():
+    with _JOBS_LOCK:
+        missing = _SETTINGS["workers"] - len(_WORKERS)
+        for _ in range(max(0, missing)):
+            thread = threading.Thread(target=_worker, name=f"job-worker-{len(_WORKERS)}", daemon=True)
+            _WORKERS.append(thread)
+            thread.start()
@@ -0,0 +1,203 @@
+"""
+Per-run output isolation.
+
+Every render/publish run (scheduled job, /run_now, /preview, the YouTube +
+Gemini flow...) gets its own directory under jobs.dir and a copy of the
+config whose paths.output_video (and any explicit rendition outputs) point
+inside it, so parallel runs never overwrite each other's files mid-encode or
+mid-upload. A small job.json manifest records the run's state and artifact;
+/download_last reads the newest finished one, and the reaper deletes old job
+directories once they fall outside jobs.keep / jobs.max_age_hours.
+"""
+
+import copy
+import contextlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import job_queue
+
+MANIFEST = "job.json"
+
+_ACTIVE = {}  # id -> dir of jobs running in this process; never reaped
+_ACTIVE_LOCK = threading.Lock()
+_REAP_LOCK = threading.Lock()
+
+
+def _settings(config):
+    jobs_cfg = (config or {}).get("jobs") or {}
+    return {
+        "dir": jobs_cfg.get("dir", "jobs"),
+        "keep": int(jobs_cfg.get("keep", 20)),
+        "max_age_hours": float(jobs_cfg.get("max_age_hours", 72)),
+    }
+
+
+def _write_manifest(job_dir, manifest):
+    tmp = os.path.join(job_dir, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(job_dir, MANIFEST))
+
+
+def read_manifest(job_dir):
+    try:
+        with open(os.path.join(job_dir, MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def new_job(config, kind):
+    """
+    Create a job directory and return {"id", "kind", "dir", "output_video",
+    "config"}; job["config"] is a deep copy of config with every output path
+    scoped to the job, and is what the render and the uploaders must use.
+    Inside a queued job the directory takes the queue's job id.
+    """
+    settings = _settings(config)
+    job_id = job_queue.current_job_id() or f"{time.strftime('%Y%m%d-%H%M%S')}_{kind}_{uuid.uuid4().hex[:6]}"
+    job_dir = os.path.join(settings["dir"], job_id)
+    os.makedirs(job_dir, exist_ok=True)
+
+    job_config = copy.deepcopy(config or {})
+    paths = job_config.setdefault("paths", {})
+    ext = os.path.splitext(paths.get("output_video") or "output.mp4")[1] or ".mp4"
+    output_video = os.path.join(job_dir, "output" + ext)
+    paths["output_video"] = output_video
+    # Renditions with a fixed output file would still be shared between runs
+    for profile in ((job_config.get("video") or {}).get("renditions") or {}).values():
+        if isinstance(profile, dict) and profile.get("output"):
+            profile["output"] = os.path.join(job_dir, os.path.basename(profile["output"]))
+
+    job = {"id": job_id, "kind": kind, "dir": job_dir, "output_video": output_video, "config": job_config}
+    with _ACTIVE_LOCK:
+        _ACTIVE[job_id] = job_dir
+    _write_manifest(job_dir, {
+        "id": job_id, "kind": kind, "state": "running", "started": time.time(),
+        "finished": None, "artifact": None, "error": None,
+    })
+    return job
+
+
+def active_dirs():
+    """Directories of the jobs running in this process."""
+    with _ACTIVE_LOCK:
+        return list(_ACTIVE.values())
+
+
+def finish_job(job, error=None):
+    """Record the job's outcome (done when its output exists), then reap old jobs."""
+    manifest = read_manifest(job["dir"]) or {"id": job["id"], "kind": job["kind"], "started": None}
+    done = error is None and os.path.exists(job["output_video"])
+    manifest.update({
+        "state": "done" if done else "failed",
+        "finished": time.time(),
+        "artifact": job["output_video"] if done else None,
+        "error": str(error) if error is not None else (None if done else "no output produced"),
+    })
+    try:
+        _write_manifest(job["dir"], manifest)
+    finally:
+        with _ACTIVE_LOCK:
+            _ACTIVE.pop(job["id"], None)
+    reap(job["config"])
+    return manifest
+
+
+@contextlib.contextmanager
+def job_scope(config, kind):
+    """with job_scope(config, "preview") as job: ... — new_job + finish_job, failed on exceptions."""
+    job = new_job(config, kind)
+    try:
+        yield job
+    except BaseException as e:
+        finish_job(job, error=e)
+        raise
+    finish_job(job)
+
+
+def list_jobs(config):
+    """Manifests of all jobs on disk (plus their "dir"), newest first."""
+    root = _settings(config)["dir"]
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return []
+    found = []
+    for name in names:
+        job_dir = os.path.join(root, name)
+        if not os.path.isdir(job_dir):
+            continue
+        manifest = read_manifest(job_dir) or {"id": name, "state": "unknown", "started": None}
+        manifest["dir"] = job_dir
+        if not manifest.get("started"):
+            manifest["started"] = os.path.getmtime(job_dir)
+        found.append(manifest)
+    found.sort(key=lambda m: m["started"], reverse=True)
+    return found
+
+
+def get_manifest(config, job_id):
+    """Manifest of job_id's output directory, or None."""
+    if not job_id or os.path.basename(job_id) != job_id:
+        return None
+    return read_manifest(os.path.join(_settings(config)["dir"], job_id))
+
+
+def latest_artifact(config, job_id=None):
+    """Path of the newest finished job's video (or of job_id's), None if there is none."""
+    finished = [
+        m for m in list_jobs(config)
+        if m.get("state") == "done" and m.get("artifact") and os.path.exists(m["artifact"])
+        and (job_id is None or m.get("id") == job_id)
+    ]
+    if not finished:
+        return None
+    return max(finished, key=lambda m: m.get("finished") or 0)["artifact"]
+
+
+def _dir_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def reap(config):
+    """
+    Delete job directories beyond the newest jobs.keep or older than
+    jobs.max_age_hours. Jobs still running in this process are never touched.
+    Returns (jobs removed, bytes freed).
+    """
+    settings = _settings(config)
+    cutoff = time.time() - settings["max_age_hours"] * 3600 if settings["max_age_hours"] > 0 else None
+    removed = freed = 0
+    with _REAP_LOCK:
+        with _ACTIVE_LOCK:
+            active = set(_ACTIVE)
+        kept = 0
+        for manifest in list_jobs(config):
+            if manifest.get("id") in active:
+                continue
+            if manifest.get("state") == "running" and (cutoff is None or manifest["started"] >= cutoff):
+                continue  # Possibly another process's job; only age can expire it
+            kept += 1
+            if kept <= settings["keep"] and (cutoff is None or manifest["started"] >= cutoff):
+                continue
+            size = _dir_size(manifest["dir"])
+            shutil.rmtree(manifest["dir"], ignore_errors=True)
+            if not os.path.exists(manifest["dir"]):
+                removed += 1
+                freed += size
+    if removed:
+        print(f"🧹 Reaped {removed} old job dir(s), freed {freed / 1024 / 1024:.1f} MB")
+    return removed, freed
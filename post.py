@@ -1,8 +1,14 @@
+import bisect
+import functools
+import json
 import os
 import random
 import sys
+import threading
+from collections import namedtuple
 import arabic_reshaper
 from bidi.algorithm import get_display
+import disk_cache
 # NOTE: moviepy/Pillow/numpy are imported lazily inside generate_video()
 # so the Flask control panel can run even if video dependencies aren't installed yet.
 
@@ -11,12 +17,22 @@ TEXTS_FILE = 'texts.txt'
 BASE_VIDEO = 'base.mp4'
 OUTPUT_VIDEO = 'output.mp4'
 FONT_SIZE = 70
+CACHE_DIR = os.environ.get("RENDER_CACHE_DIR", ".cache")
+FONT_INDEX_FILE = os.path.join(CACHE_DIR, "font_index.json")
+FONT_INDEX_VERSION = 1
+# Arabic, Arabic Supplement, Arabic Extended-A and the presentation forms produced by arabic_reshaper
+ARABIC_RANGES = ((0x0600, 0x06FF), (0x0750, 0x077F), (0x08A0, 0x08FF), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF))
+JOINING_CONTROLS = ("\u200c", "\u200d", "\u0640")  # ZWNJ, ZWJ, tatweel
 
-def find_font_path(font_name="arial.ttf"):
-    """
-    Find font file path across different operating systems.
-    Returns path to font or None if not found.
-    """
+# Text overlay cropped to its drawn area: RGBA pixels + top-left offset inside a frame of frame_size
+# (path: the cached PNG of the crop, when the overlay cache is used)
+TextOverlay = namedtuple("TextOverlay", ["image", "x", "y", "frame_size", "path"], defaults=(None,))
+
+_FONT_INDEXES = {}
+_FONT_INDEX_LOCK = threading.Lock()
+
+def _font_search_paths(font_name="arial.ttf"):
+    """Candidate font files/directories for this OS, in priority order."""
     # Common font paths by OS
     font_paths = []
     
@@ -57,20 +73,145 @@ def find_font_path(font_name="arial.ttf"):
             os.path.expanduser("~/Library/Fonts/Arial.ttf"),
         ]
     
-    # Try each path
-    for path in font_paths:
-        if os.path.isfile(path):
-            return path
-        # If it's a directory, search for TTF files
+    return font_paths
+
+def _font_coverage(font_path):
+    """
+    Code point coverage of a font as sorted [first, last] ranges read from its cmap.
+    Returns None when the cmap can't be read (e.g. fontTools not installed).
+    """
+    try:
+        from fontTools.ttLib import TTFont
+    except ImportError:
+        return None
+    try:
+        tt = TTFont(font_path, lazy=True, fontNumber=0)
+        try:
+            cmap = tt.getBestCmap() or {}
+        finally:
+            tt.close()
+    except Exception as e:
+        print(f"⚠️ Could not read cmap of {font_path}: {e}")
+        return None
+    ranges = []
+    for cp in sorted(cmap):
+        if ranges and cp == ranges[-1][1] + 1:
+            ranges[-1][1] = cp
+        else:
+            ranges.append([cp, cp])
+    return ranges
+
+def _dir_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def _build_font_index(search_paths):
+    # Same discovery order as the old os.walk lookup, so fonts[0] is what find_font_path() always returned
+    fonts = []
+    seen = set()
+    dirs = {}
+    for path in search_paths:
         if os.path.isdir(path):
-            for root, dirs, files in os.walk(path):
+            for root, _dirs, files in os.walk(path):
+                dirs[root] = _dir_mtime(root)
                 for file in files:
-                    if file.lower().endswith(('.ttf', '.otf')):
-                        full_path = os.path.join(root, file)
-                        if os.path.isfile(full_path):
-                            return full_path
-    
-    return None
+                    full_path = os.path.join(root, file)
+                    if file.lower().endswith(('.ttf', '.otf')) and full_path not in seen and os.path.isfile(full_path):
+                        seen.add(full_path)
+                        fonts.append({"path": full_path, "coverage": _font_coverage(full_path)})
+        else:
+            # Watch the parent directory too, so a font installed later invalidates the index
+            parent = os.path.dirname(path)
+            dirs[parent] = _dir_mtime(parent)
+            if os.path.isfile(path) and path not in seen:
+                seen.add(path)
+                fonts.append({"path": path, "coverage": _font_coverage(path)})
+    return {"version": FONT_INDEX_VERSION, "search_paths": list(search_paths), "dirs": dirs, "fonts": fonts}
+
+def _font_index_is_fresh(index, search_paths):
+    if not isinstance(index, dict) or index.get("version") != FONT_INDEX_VERSION:
+        return False
+    if index.get("search_paths") != list(search_paths):
+        return False
+    return all(_dir_mtime(d) == mtime for d, mtime in (index.get("dirs") or {}).items())
+
+def _load_font_index(font_name="arial.ttf"):
+    """
+    Return the font index for this OS, building it only when the on-disk copy is
+    missing or one of the scanned font directories changed (mtime).
+    """
+    search_paths = _font_search_paths(font_name)
+    key = tuple(search_paths)
+    with _FONT_INDEX_LOCK:
+        index = _FONT_INDEXES.get(key)
+        if index is not None:
+            return index
+        try:
+            with open(FONT_INDEX_FILE, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = None
+        if not _font_index_is_fresh(index, search_paths):
+            print("🔎 Building font index...")
+            index = _build_font_index(search_paths)
+            try:
+                os.makedirs(os.path.dirname(FONT_INDEX_FILE) or ".", exist_ok=True)
+                tmp_path = FONT_INDEX_FILE + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(index, f)
+                os.replace(tmp_path, FONT_INDEX_FILE)
+            except OSError as e:
+                print(f"⚠️ Could not save font index: {e}")
+        _FONT_INDEXES[key] = index
+        return index
+
+def find_font_path(font_name="arial.ttf"):
+    """
+    Find font file path across different operating systems.
+    Returns path to font or None if not found.
+    """
+    fonts = _load_font_index(font_name)["fonts"]
+    return fonts[0]["path"] if fonts else None
+
+def _is_arabic_code_point(cp):
+    return any(first <= cp <= last for first, last in ARABIC_RANGES)
+
+def _covers(coverage, code_points):
+    for cp in code_points:
+        i = bisect.bisect_right(coverage, [cp, sys.maxsize]) - 1
+        if i < 0 or coverage[i][1] < cp:
+            return False
+    return True
+
+@functools.lru_cache(maxsize=16)
+def _preferred_font_coverage(font_path):
+    return _font_coverage(font_path)
+
+@functools.lru_cache(maxsize=256)
+def _select_font(required, preferred):
+    if preferred:
+        coverage = _preferred_font_coverage(preferred)
+        # Can't verify without a cmap: keep the user's choice
+        if coverage is None or _covers(coverage, required):
+            return preferred
+    for entry in _load_font_index()["fonts"]:
+        if entry["coverage"] is not None and _covers(entry["coverage"], required):
+            return entry["path"]
+    print("⚠️ No indexed font covers every Arabic character of this text")
+    return preferred or find_font_path()
+
+def select_font_for_text(text, preferred=None):
+    """
+    Pick the first font that covers every Arabic code point of the text.
+
+    The configured font (preferred) is tried first, then the font index in
+    priority order. Coverage is checked on the reshaped text, since Pillow
+    draws the Arabic presentation forms produced by arabic_reshaper.
+    """
+    required = frozenset(ord(c) for c in process_arabic_text(text) if _is_arabic_code_point(ord(c)))
+    return _select_font(required, preferred or None)
 
 # Default font path - will be resolved at runtime
 FONT_PATH = find_font_path() or 'C:\\Windows\\Fonts\\arial.ttf'  # Fallback for Windows
@@ -78,6 +219,11 @@ TEXT_COLOR = (255, 255, 255)
 SHADOW_COLOR = (0, 0, 0)
 VIDEO_DURATION = 10 # Seconds (if generating base video)
 VIDEO_SIZE = (1080, 1920) # 9:16 format (Reels/TikTok style)
+FONT_CACHE_SIZE = 64 # Max (path, size, layout engine) font objects kept in memory
+SHAPING_CACHE_SIZE = 4096 # Max reshaped + bidi display strings kept in memory
+ARABIC_RESHAPER_CONFIG = {} # Extra arabic_reshaper settings, e.g. {"delete_harakat": False}
+OVERLAY_CACHE_VERSION = 2 # Bump when the overlay drawing changes, to invalidate cached overlays
+RENDER_CACHE_VERSION = 2 # Bump when the render pipeline output changes, to invalidate cached videos
 
 def _hex_to_rgb(hex_color: str, fallback=(255, 255, 255)):
     if not hex_color:
@@ -110,6 +256,22 @@ def _set_fps_compat(clip, fps):
         return clip.with_fps(fps)
     raise AttributeError("Clip does not support setting fps")
 
+def _subclip_compat(clip, start, end):
+    # MoviePy 1.x: subclip, MoviePy 2.x: subclipped
+    if hasattr(clip, "subclip"):
+        return clip.subclip(start, end)
+    if hasattr(clip, "subclipped"):
+        return clip.subclipped(start, end)
+    raise AttributeError("Clip does not support subclips")
+
+def _image_transform_compat(clip, func):
+    # MoviePy 1.x: fl_image, MoviePy 2.x: image_transform
+    if hasattr(clip, "fl_image"):
+        return clip.fl_image(func)
+    if hasattr(clip, "image_transform"):
+        return clip.image_transform(func)
+    raise AttributeError("Clip does not support frame transforms")
+
 def load_texts(filepath):
     """Load motivational texts from a file."""
     if not os.path.exists(filepath):
@@ -126,19 +288,31 @@ def process_arabic_text(text):
     1. Reshape Arabic characters (connect letters properly)
     2. Use get_display() to reverse the text order for RTL display
     This ensures Arabic text appears correctly in videos with proper character joining.
+
+    Shaped lines are memoized (bounded LRU keyed by the raw text and the
+    reshaper settings), so each distinct line is shaped once per process.
     """
     if not text:
         return ""
+    return _shape_text(text, tuple(sorted(ARABIC_RESHAPER_CONFIG.items())))
+
+@functools.lru_cache(maxsize=8)
+def _get_reshaper(settings):
+    # Default configuration handles Arabic properly:
+    # delete_harakat=True (default): Remove diacritics for cleaner display
+    # support_ligatures=True (default): Support Arabic ligatures for better text joining
+    if not settings:
+        return arabic_reshaper.default_reshaper
+    return arabic_reshaper.ArabicReshaper(configuration=dict(settings))
+
+@functools.lru_cache(maxsize=SHAPING_CACHE_SIZE)
+def _shape_text(text, settings):
+    reshape = _get_reshaper(settings).reshape
     try:
-        # Configure arabic_reshaper for better Arabic text handling
-        # We use default configuration which handles Arabic properly
-        # delete_harakat=True (default): Remove diacritics for cleaner display
-        # support_ligatures=True (default): Support Arabic ligatures for better text joining
-        
         # Step 1: Reshape Arabic characters (connects letters properly)
         # This converts isolated Arabic characters to their proper contextual forms
         # The reshape function automatically handles character joining
-        reshaped_text = arabic_reshaper.reshape(text)
+        reshaped_text = reshape(text)
         
         # Step 2: Use get_display() to reverse text order for RTL
         # This is necessary because Pillow renders LTR, so we need to reverse
@@ -153,15 +327,123 @@ def process_arabic_text(text):
         print(f"   Original text: {text[:50]}...")
         # Try to return at least reshaped text without bidi if reshape works
         try:
-            return arabic_reshaper.reshape(text)
+            return reshape(text)
         except:
             return text
 
+@functools.lru_cache(maxsize=FONT_CACHE_SIZE)
+def _load_truetype(font_path, size, layout_engine):
+    from PIL import ImageFont
+    if layout_engine is None:
+        return ImageFont.truetype(font_path, size)
+    return ImageFont.truetype(font_path, size, layout_engine=layout_engine)
+
+def get_font(font_path, size):
+    """
+    Load a TrueType font through the process-wide LRU font cache.
+
+    Fonts are keyed by (path, size, layout engine), so the auto-fit loop and
+    repeated renders reuse the parsed TTF instead of reopening it every time.
+    """
+    from PIL import ImageFont
+    # BASIC layout keeps arabic_reshaper's presentation forms as-is (no Raqm needed)
+    layout_engine = getattr(getattr(ImageFont, "Layout", None), "BASIC", None)
+    try:
+        return _load_truetype(font_path, int(size), layout_engine)
+    except TypeError:
+        # Fallback for older Pillow versions without layout_engine
+        return _load_truetype(font_path, int(size), None)
+
+def _lru_stats(cached_func):
+    info = cached_func.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
+
+def font_cache_stats():
+    return _lru_stats(_load_truetype)
+
+def shaping_cache_stats():
+    return _lru_stats(_shape_text)
+
+def render_metrics():
+    """Counters of the in-process render caches (exposed by /render_metrics)."""
+    return {
+        "font_cache": font_cache_stats(),
+        "shaping_cache": shaping_cache_stats(),
+        "disk_caches": disk_cache.all_stats(),
+    }
+
+def _load_font_with_fallback(font_path, size):
+    from PIL import ImageFont
+    try:
+        return get_font(font_path, size)
+    except (IOError, OSError) as e:
+        print(f"⚠️ Warning: Font not found at {font_path}: {e}")
+        # Try to find another font with Arabic support
+        found_font = find_font_path()
+        if found_font and found_font != font_path:
+            try:
+                font = get_font(found_font, size)
+                print(f"✅ Using alternative font: {found_font}")
+                return font
+            except (IOError, OSError):
+                pass
+        print("⚠️ Using default font (may not support Arabic)")
+        return ImageFont.load_default()
+
+def _needs_line_shaping(word):
+    # Joining controls / tatweel at a word edge make the shaped line differ from its shaped words
+    return word[0] in JOINING_CONTROLS or word[-1] in JOINING_CONTROLS
+
 def _wrap_text_to_width(draw, text, font, max_width_px):
-    # Simple word-wrap by spaces (works fine for Arabic sentences too)
+    """
+    Greedy word-wrap by spaces (works fine for Arabic sentences too).
+
+    Each word and the space are measured once (advance widths) and summed, so
+    wrapping is linear in the word count. Arabic joining never crosses a space,
+    so a shaped line is as wide as its shaped words plus spaces; the exact
+    full-line bbox is only measured when that sum is too close to the limit to
+    decide (ink bearings at the line ends, kerning) or a word boundary carries
+    a joining control. The result is the same as measuring every candidate.
+    """
     words = (text or "").split()
     if not words:
         return [""]
+    if not hasattr(font, "getlength"):
+        return _wrap_text_to_width_exact(draw, words, font, max_width_px)
+
+    # Largest gap between summed advances and the line's ink width we trust without measuring
+    margin = max(4, int(getattr(font, "size", 0)) // 2)
+    space_w = font.getlength(" ")
+    word_widths = {}
+
+    def word_width(word):
+        if word not in word_widths:
+            word_widths[word] = font.getlength(process_arabic_text(word))
+        return word_widths[word]
+
+    lines = []
+    current = words[0]
+    current_w = word_width(current)
+    for w in words[1:]:
+        candidate = current + " " + w
+        candidate_w = current_w + space_w + word_width(w)
+        if _needs_line_shaping(current) or _needs_line_shaping(w) or abs(candidate_w - max_width_px) <= margin:
+            bbox = draw.textbbox((0, 0), process_arabic_text(candidate), font=font)
+            fits = (bbox[2] - bbox[0]) <= max_width_px
+        else:
+            fits = candidate_w < max_width_px
+        if fits:
+            current = candidate
+            current_w = candidate_w
+        else:
+            lines.append(current)
+            current = w
+            current_w = word_width(w)
+    lines.append(current)
+    return lines
+
+def _wrap_text_to_width_exact(draw, words, font, max_width_px):
+    # Fonts without getlength (very old Pillow): measure every candidate line
     lines = []
     current = words[0]
     for w in words[1:]:
@@ -184,79 +466,138 @@ def _measure_text_block(draw, lines, font, line_spacing_px):
     max_w = max((w for w, _ in line_sizes), default=0)
     return disp_lines, line_sizes, max_w, total_h
 
-def create_text_image(text, size, font_path, font_size, color, shadow_color=(0, 0, 0), shadow_offset=2, max_width_pct=0.86, max_height_pct=0.55, line_spacing_px=14, align="center", position=None, min_font_size=38):
-    """Create a transparent image with centered text using Pillow."""
-    from PIL import Image, ImageDraw, ImageFont
-    import numpy as np
+def _fit_text_layout(draw, text, font_path, font_size, min_font_size, max_width_px, max_height_px, line_spacing_px, search="bisect"):
+    """
+    Find the largest size in font_size, font_size - 2, ..., min_font_size whose
+    wrapped text block fits inside max_width_px x max_height_px.
 
-    # Create image with transparent background
-    img = Image.new('RGBA', size, (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img)
-    
-    max_width_px = int(size[0] * float(max_width_pct))
-    max_height_px = int(size[1] * float(max_height_pct))
+    search="bisect" binary-searches that size ladder (a few layout passes
+    instead of one per 2px step); search="linear" is the original top-down
+    scan, kept as the reference for bench_autofit.py (which checks that both
+    pick the same size and line breaks for every quote in texts.txt).
 
-    # Auto-fit: shrink font until wrapped text fits inside max width/height
-    fitted = False
-    current_size = int(font_size)
-    font = None
-    raw_lines = None
-    disp_lines = None
-    line_sizes = None
-    total_h = None
+    Returns a dict with font, size, raw_lines, disp_lines, line_sizes, total_h,
+    fitted and passes (number of wrap + measure passes).
+    """
+    sizes = list(range(int(font_size), int(min_font_size) - 1, -2))
+    layouts = {}
 
-    while current_size >= int(min_font_size):
-        try:
-            # Load font with better Arabic support
-            # Use layout_engine='OT' for better OpenType support (helps with Arabic)
-            try:
-                font = ImageFont.truetype(font_path, current_size, layout_engine=ImageFont.Layout.BASIC)
-            except (TypeError, AttributeError):
-                # Fallback for older Pillow versions
-                font = ImageFont.truetype(font_path, current_size)
-        except (IOError, OSError) as e:
-            print(f"⚠️ Warning: Font not found at {font_path}: {e}")
-            # Try to find another font with Arabic support
-            found_font = find_font_path()
-            if found_font and found_font != font_path:
-                try:
-                    try:
-                        font = ImageFont.truetype(found_font, current_size, layout_engine=ImageFont.Layout.BASIC)
-                    except (TypeError, AttributeError):
-                        font = ImageFont.truetype(found_font, current_size)
-                    print(f"✅ Using alternative font: {found_font}")
-                except:
-                    print("⚠️ Using default font (may not support Arabic)")
-                    font = ImageFont.load_default()
+    def layout_at(i):
+        if i not in layouts:
+            font = _load_font_with_fallback(font_path, sizes[i])
+            raw_lines = _wrap_text_to_width(draw, text, font, max_width_px=max_width_px)
+            disp_lines, line_sizes, max_w, total_h = _measure_text_block(draw, raw_lines, font, line_spacing_px)
+            layouts[i] = {
+                "font": font,
+                "size": sizes[i],
+                "raw_lines": raw_lines,
+                "disp_lines": disp_lines,
+                "line_sizes": line_sizes,
+                "total_h": total_h,
+                "fitted": max_w <= max_width_px and total_h <= max_height_px,
+            }
+        return layouts[i]
+
+    if search == "linear":
+        found = next((i for i in range(len(sizes)) if layout_at(i)["fitted"]), len(sizes))
+    elif sizes and layout_at(0)["fitted"]:
+        # Most quotes fit at the configured size: one pass
+        found = 0
+    else:
+        # Smallest index (= largest size) that fits; index 0 is known not to fit
+        lo, hi = 1, len(sizes)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if layout_at(mid)["fitted"]:
+                hi = mid
             else:
-                print("⚠️ Using default font (may not support Arabic)")
-                font = ImageFont.load_default()
+                lo = mid + 1
+        found = lo
+        # "Fits" is only monotonic while the line breaks stay the same: a larger
+        # size wrapped into the same number of lines can still fit (different
+        # breaks, shorter lines), so re-check upward until the text needs more
+        # lines, as the linear scan would have found it.
+        anchor = min(found, len(sizes) - 1)
+        line_count = len(layout_at(anchor)["raw_lines"])
+        i = anchor - 1
+        while i >= 0 and len(layout_at(i)["raw_lines"]) <= line_count:
+            if layouts[i]["fitted"]:
+                found = i
+            i -= 1
 
+    if found < len(sizes):
+        result = dict(layouts[found])
+    elif sizes:
+        # Nothing fits: use the smallest size; keep wrapping as best-effort
+        result = dict(layout_at(len(sizes) - 1))
+    else:
+        # font_size below min_font_size: render once at min_font_size
+        font = _load_font_with_fallback(font_path, int(min_font_size))
         raw_lines = _wrap_text_to_width(draw, text, font, max_width_px=max_width_px)
-        disp_lines, line_sizes, max_w, total_h = _measure_text_block(draw, raw_lines, font, line_spacing_px)
+        disp_lines, line_sizes, _, total_h = _measure_text_block(draw, raw_lines, font, line_spacing_px)
+        layouts[None] = result = {
+            "font": font,
+            "size": int(min_font_size),
+            "raw_lines": raw_lines,
+            "disp_lines": disp_lines,
+            "line_sizes": line_sizes,
+            "total_h": total_h,
+            "fitted": False,
+        }
+    result["passes"] = len(layouts)
+    return result
+
+def get_overlay_cache(config=None):
+    """On-disk cache of rendered text overlays (see create_text_image(cache=...))."""
+    cache_cfg = (config or {}).get("cache") or {}
+    directory = os.path.join(cache_cfg.get("dir", CACHE_DIR), "overlays")
+    max_bytes = int(float(cache_cfg.get("overlay_max_mb", 64)) * 1024 * 1024)
+    return disk_cache.get_cache("overlays", directory, max_bytes)
 
-        if max_w <= max_width_px and total_h <= max_height_px:
-            fitted = True
-            break
-        current_size -= 2
+def create_text_overlay(text, size, font_path, font_size, color, shadow_color=(0, 0, 0), shadow_offset=2, max_width_pct=0.86, max_height_pct=0.55, line_spacing_px=14, align="center", position=None, min_font_size=38, cache=None):
+    """
+    Render the text overlay for a frame of the given size using Pillow.
+
+    Returns a TextOverlay: the RGBA pixels cropped to the drawn box/text plus
+    their (x, y) offset in the frame, so compositing only touches that region.
+
+    When a DiskCache is passed (get_overlay_cache()), the overlay is looked up by a
+    hash of the text, font file, every style field and the frame size before drawing.
+    """
+    from PIL import Image, ImageDraw
+    from PIL.PngImagePlugin import PngInfo
+    import numpy as np
 
-    if not fitted:
-        # Use the smallest size we reached; keep wrapping as best-effort
-        if font is None:
+    cache_key = None
+    if cache is not None:
+        cache_key = disk_cache.make_key(
+            "overlay", OVERLAY_CACHE_VERSION, text, size, disk_cache.file_fingerprint(font_path) or font_path,
+            font_size, color, shadow_color, shadow_offset, max_width_pct, max_height_pct,
+            line_spacing_px, align, position, min_font_size,
+        )
+        cached_path = cache.get(cache_key, ".png")
+        if cached_path:
             try:
-                font = ImageFont.truetype(font_path, int(min_font_size))
-            except (IOError, OSError):
-                # Try alternative font
-                found_font = find_font_path()
-                if found_font:
-                    try:
-                        font = ImageFont.truetype(found_font, int(min_font_size))
-                    except:
-                        font = ImageFont.load_default()
-                else:
-                    font = ImageFont.load_default()
-        raw_lines = raw_lines or _wrap_text_to_width(draw, text, font, max_width_px=max_width_px)
-        disp_lines, line_sizes, _, total_h = _measure_text_block(draw, raw_lines, font, line_spacing_px)
+                with Image.open(cached_path) as cached:
+                    x, y = (int(v) for v in cached.text["overlay_offset"].split(","))
+                    return TextOverlay(np.array(cached.convert("RGBA")), x, y, tuple(size), cached_path)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable cached overlay {cached_path}: {e}")
+
+    # Create image with transparent background
+    img = Image.new('RGBA', size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    
+    max_width_px = int(size[0] * float(max_width_pct))
+    max_height_px = int(size[1] * float(max_height_pct))
+
+    # Auto-fit: largest font size (font_size, font_size - 2, ...) whose wrapped text fits inside max width/height
+    layout = _fit_text_layout(draw, text, font_path, font_size, min_font_size, max_width_px, max_height_px, line_spacing_px)
+    font = layout["font"]
+    current_size = layout["size"]
+    disp_lines = layout["disp_lines"]
+    line_sizes = layout["line_sizes"]
+    total_h = layout["total_h"]
 
     # Position is (x_center_px, y_center_px) by default
     if not position:
@@ -311,86 +652,287 @@ def create_text_image(text, size, font_path, font_size, color, shadow_color=(0,
             stroke_width=stroke_width, stroke_fill=(15, 15, 15) # Dark elegant outline frame
         )
         y += h + int(line_spacing_px)
-    
-    return np.array(img)
 
-def generate_video(config=None):
-    """Main function to generate the daily video."""
-    print("--- 🚀 Starting Video Automation System ---")
+    # Crop to everything that was drawn (box, shadow, strokes)
+    bbox = img.getchannel("A").getbbox() or (0, 0, 0, 0)
+    img = img.crop(bbox)
+
+    cached_path = None
+    if cache_key is not None:
+        meta = PngInfo()
+        meta.add_text("overlay_offset", f"{bbox[0]},{bbox[1]}")
+        try:
+            cached_path = cache.put(cache_key, ".png", lambda tmp_path: img.save(tmp_path, format="PNG", compress_level=1, pnginfo=meta))
+        except OSError as e:
+            print(f"⚠️ Could not cache overlay: {e}")
+
+    return TextOverlay(np.array(img), bbox[0], bbox[1], tuple(size), cached_path)
+
+def create_text_image(text, size, font_path, font_size, color, shadow_color=(0, 0, 0), shadow_offset=2, max_width_pct=0.86, max_height_pct=0.55, line_spacing_px=14, align="center", position=None, min_font_size=38, cache=None):
+    """Create a full-frame transparent image with centered text using Pillow."""
+    import numpy as np
+
+    overlay = create_text_overlay(
+        text, size, font_path, font_size, color, shadow_color=shadow_color, shadow_offset=shadow_offset,
+        max_width_pct=max_width_pct, max_height_pct=max_height_pct, line_spacing_px=line_spacing_px,
+        align=align, position=position, min_font_size=min_font_size, cache=cache,
+    )
+    h, w = overlay.image.shape[:2]
+    frame = np.zeros((size[1], size[0], 4), dtype=np.uint8)
+    frame[overlay.y:overlay.y + h, overlay.x:overlay.x + w] = overlay.image
+    return frame
+
+def make_overlay_blender(overlay):
+    """
+    Return frame -> frame that alpha-blends the overlay over an RGB frame.
+
+    The alpha mask and premultiplied colors are computed once here; each call
+    only blends the overlay's bounding box and copies the rest of the frame.
+    """
+    import numpy as np
+
+    h, w = overlay.image.shape[:2]
+    x0, y0 = overlay.x, overlay.y
+    alpha = overlay.image[:, :, 3:4].astype(np.float32) / 255.0
+    inv_alpha = 1.0 - alpha
+    # +0.5 rounds to nearest when truncating back to uint8
+    premultiplied = overlay.image[:, :, :3].astype(np.float32) * alpha + 0.5
+
+    def blend(frame, out=None):
+        # out: optional reusable uint8 buffer of the frame's shape (avoids one allocation per frame)
+        if out is None:
+            out = np.array(frame, dtype=np.uint8, copy=True)
+        else:
+            np.copyto(out, frame)
+        region = out[y0:y0 + h, x0:x0 + w, :3]
+        region[...] = (region * inv_alpha + premultiplied).astype(np.uint8)
+        return out
+
+    return blend
+
+def _overlay_position(text_cfg, frame_size):
+    # Position is the text block center in pixels
+    w, h = frame_size
+    position_mode = str(text_cfg.get("position_mode", "preset")).lower()
+    preset = str(text_cfg.get("preset", "center")).lower()
+    if position_mode == "manual":
+        x_pct = float(text_cfg.get("x_pct", 0.5))
+        y_pct = float(text_cfg.get("y_pct", 0.5))
+        return (int(w * x_pct), int(h * y_pct))
+    if preset == "top":
+        return (int(w * 0.5), int(h * 0.22))
+    if preset == "bottom":
+        return (int(w * 0.5), int(h * 0.78))
+    return (int(w * 0.5), int(h * 0.5))
+
+def build_text_overlay(text, frame_size, font_path, config=None):
+    """Text overlay for a frame of frame_size, styled and positioned from config["text_overlay"]."""
+    text_cfg = (config or {}).get("text_overlay") or {}
+    # We generate an image for the text to ensure complex scripts (Arabic) render correctly without ImageMagick issues
+    return create_text_overlay(
+        text,
+        tuple(frame_size),
+        font_path,
+        int(text_cfg.get("font_size", FONT_SIZE)),
+        _hex_to_rgb(text_cfg.get("color"), fallback=TEXT_COLOR),
+        shadow_color=_hex_to_rgb(text_cfg.get("shadow_color"), fallback=SHADOW_COLOR),
+        shadow_offset=int(text_cfg.get("shadow_offset", 2)),
+        max_width_pct=float(text_cfg.get("max_width_pct", 0.86)),
+        max_height_pct=float(text_cfg.get("max_height_pct", 0.55)),
+        line_spacing_px=int(text_cfg.get("line_spacing_px", 14)),
+        align=str(text_cfg.get("align", "center")).lower(),
+        position=_overlay_position(text_cfg, frame_size),
+        min_font_size=int(text_cfg.get("min_font_size", 38)),
+        cache=get_overlay_cache(config),
+    )
+
+def _overlay_png_path(overlay, tmp_dir):
+    """PNG file of the overlay crop for ffmpeg: the cached one, or a temp copy."""
+    if overlay.path and os.path.exists(overlay.path):
+        return overlay.path
+    from PIL import Image
+    os.makedirs(tmp_dir, exist_ok=True)
+    path = os.path.join(tmp_dir, f"overlay_{os.getpid()}_{threading.get_ident()}.png")
+    Image.fromarray(overlay.image).save(path, format="PNG", compress_level=1)
+    return path
+
+def get_renditions(config=None, renditions=None):
+    """Rendition profiles keyed by publish target: the given ones, else config["video"]["renditions"]."""
+    if renditions is None:
+        renditions = ((config or {}).get("video") or {}).get("renditions") or {}
+    if isinstance(renditions, list):
+        renditions = {str(r.get("target")): r for r in renditions if r.get("target")}
+    return dict(renditions)
+
+def rendition_path(config, target, profile=None):
+    """Output file of a target's rendition: profile["output"], else output.mp4 -> output_<target>.mp4."""
+    if profile and profile.get("output"):
+        return profile["output"]
+    output_video = ((config or {}).get("paths") or {}).get("output_video", OUTPUT_VIDEO)
+    stem, ext = os.path.splitext(output_video)
+    return f"{stem}_{target}{ext or '.mp4'}"
+
+def _drop_renditions(config, renditions):
+    """Delete every rendition file of renditions (stale, or partial output of a failed encode)."""
+    for target, profile in renditions.items():
+        path = rendition_path(config, target, profile)
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def video_path_for(config, target):
+    """File to upload for a publish target: its rendition if one was rendered, else the main output."""
+    profile = get_renditions(config).get(target)
+    if profile is not None:
+        path = rendition_path(config, target, profile)
+        if os.path.exists(path):
+            return path
+    return ((config or {}).get("paths") or {}).get("output_video", OUTPUT_VIDEO)
+
+def font_for_text(text, config=None, verbose=True):
+    """Font: the configured one if it covers the text, else the first indexed font that does."""
+    text_cfg = (config or {}).get("text_overlay") or {}
+    config_font_path = text_cfg.get("font_path", "")
+    preferred_font = config_font_path if config_font_path and os.path.exists(config_font_path) else None
+    font_path = select_font_for_text(text, preferred=preferred_font)
+    if not font_path:
+        # Fallback to default
+        font_path = FONT_PATH
+        if verbose:
+            print(f"⚠️ Using fallback font path: {font_path}")
+    elif font_path != preferred_font and verbose:
+        print(f"✅ Using system font: {font_path}")
+    return font_path
+
+def _ffmpeg_source(base_video, video_cfg, max_duration_seconds):
+    """(frame_size, source, placeholder) for ffmpeg_render: the base video, or a solid-color placeholder."""
+    import ffmpeg_render
+
+    if os.path.exists(base_video):
+        print(f"🎬 Loading base video: {base_video}")
+        return ffmpeg_render.probe_video(base_video)["size"], base_video, None
+    print(f"⚠️ {base_video} not found! Generating a placeholder background.")
+    frame_size = tuple(video_cfg.get("size", list(VIDEO_SIZE)))
+    duration = max_duration_seconds if max_duration_seconds > 0 else VIDEO_DURATION
+    return frame_size, None, (frame_size, tuple(video_cfg.get("placeholder_bg_color", [20, 30, 60])), duration)
+
+def _render_with_ffmpeg(selected_text, font_path, base_video, output_video, config, renditions=None):
+    """Render engine "ffmpeg": overlay + trim + encode in one ffmpeg process, no Python frame loop."""
+    import ffmpeg_render
+
+    video_cfg = (config or {}).get("video") or {}
+    max_duration_seconds = int(video_cfg.get("max_duration_seconds", 15))
+    fps = int(video_cfg.get("fps", 24))
+
+    frame_size, source, placeholder = _ffmpeg_source(base_video, video_cfg, max_duration_seconds)
+    overlay = build_text_overlay(selected_text, frame_size, font_path, config)
+    cache_cfg = (config or {}).get("cache") or {}
+    tmp_dir = os.path.join(cache_cfg.get("dir", CACHE_DIR), "tmp")
+    overlay_png = _overlay_png_path(overlay, tmp_dir)
+    segments = int(video_cfg.get("segments", 1))
+    try:
+        if renditions:
+            # One decode + overlay, split into the main output and one encoder per target
+            outputs = [(output_video, {})] + [
+                (rendition_path(config, target, profile), profile) for target, profile in renditions.items()
+            ]
+            ffmpeg_render.render_overlay_renditions(
+                source, overlay_png, overlay.x, overlay.y, outputs, fps,
+                duration=max_duration_seconds, placeholder=placeholder,
+            )
+            print(f"🎞️ Encoded {len(outputs)} renditions in one pass: {', '.join(['main'] + list(renditions))}")
+        elif source and segments != 1:
+            used = ffmpeg_render.render_overlay_video_segmented(
+                source, overlay_png, overlay.x, overlay.y, output_video, fps,
+                duration=max_duration_seconds, segments=segments, work_dir=tmp_dir,
+            )
+            print(f"🧩 Encoded {used} segment(s) in parallel")
+        else:
+            ffmpeg_render.render_overlay_video(
+                source, overlay_png, overlay.x, overlay.y, output_video, fps,
+                duration=max_duration_seconds, placeholder=placeholder,
+            )
+    finally:
+        if overlay_png != overlay.path:
+            try:
+                os.remove(overlay_png)
+            except OSError:
+                pass
 
+def _draft_geometry(frame_size, overlay, scale):
+    """
+    Draft output size and the overlay box scaled into it. The layout is solved
+    at full resolution (same font size and line breaks as the final render) and
+    the box edges are scaled by the exact per-axis output/input ratio.
+    """
+    w, h = frame_size
+    out_w = max(2, int(round(w * scale / 2)) * 2)  # x264 wants even dimensions
+    out_h = max(2, int(round(h * scale / 2)) * 2)
+    sx, sy = out_w / w, out_h / h
+    ov_h, ov_w = overlay.image.shape[:2]
+    x0, y0 = int(round(overlay.x * sx)), int(round(overlay.y * sy))
+    x1, y1 = int(round((overlay.x + ov_w) * sx)), int(round((overlay.y + ov_h) * sy))
+    return (out_w, out_h), (x0, y0), (max(1, x1 - x0), max(1, y1 - y0))
+
+def _render_draft(selected_text, font_path, base_video, output_video, config):
+    """Draft render: scaled-down, short, ultrafast x264; same layout as the final render."""
+    import ffmpeg_render
+
+    video_cfg = (config or {}).get("video") or {}
+    preview_cfg = (config or {}).get("preview") or {}
+    fps = int(video_cfg.get("fps", 24))
+    max_duration_seconds = int(video_cfg.get("max_duration_seconds", 15))
+    draft_seconds = float(preview_cfg.get("draft_max_seconds", 5))
+    duration = draft_seconds if max_duration_seconds <= 0 else min(draft_seconds, max_duration_seconds)
+
+    frame_size, source, placeholder = _ffmpeg_source(base_video, video_cfg, duration)
+    overlay = build_text_overlay(selected_text, frame_size, font_path, config)
+    out_size, (x, y), overlay_size = _draft_geometry(frame_size, overlay, float(preview_cfg.get("draft_scale", 0.5)))
+    print(f"📝 Draft render: {out_size[0]}x{out_size[1]}, {duration:g}s")
+
+    cache_cfg = (config or {}).get("cache") or {}
+    overlay_png = _overlay_png_path(overlay, os.path.join(cache_cfg.get("dir", CACHE_DIR), "tmp"))
+    video_args = [
+        "-c:v", "libx264", "-preset", str(preview_cfg.get("draft_preset", "ultrafast")),
+        "-crf", str(preview_cfg.get("draft_crf", 30)), "-pix_fmt", "yuv420p",
+    ]
+    try:
+        ffmpeg_render.render_overlay_video(
+            source, overlay_png, x, y, output_video, fps, duration=duration, placeholder=placeholder,
+            video_args=video_args, audio_args=["-c:a", "aac", "-b:a", "64k"],
+            output_size=out_size, overlay_size=overlay_size,
+        )
+    finally:
+        if overlay_png != overlay.path:
+            try:
+                os.remove(overlay_png)
+            except OSError:
+                pass
+
+def _render_with_moviepy(selected_text, font_path, base_video, output_video, config):
+    """Render engine "moviepy": decode frames in Python, blend the overlay, encode via write_videofile."""
     try:
         # MoviePy 2.x no longer exposes moviepy.editor. Support both 1.x and 2.x.
         try:
-            from moviepy.editor import VideoFileClip, ColorClip, ImageClip, CompositeVideoClip  # type: ignore
+            from moviepy.editor import VideoFileClip, ColorClip  # type: ignore
         except Exception:
             from moviepy.video.io.VideoFileClip import VideoFileClip
-            from moviepy.video.VideoClip import ColorClip, ImageClip
-            from moviepy.video.compositing.CompositeVideoClip import CompositeVideoClip
+            from moviepy.video.VideoClip import ColorClip
     except Exception as e:
         raise RuntimeError(
             "Missing dependency: moviepy. Install it inside your venv with: "
             "python -m pip install moviepy"
         ) from e
-    
-    # Check FFmpeg availability (required by MoviePy)
-    try:
-        import imageio_ffmpeg
-        ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()
-        if not ffmpeg_path or not os.path.exists(ffmpeg_path):
-            print("⚠️ Warning: FFmpeg not found. Video processing may fail.")
-            print("   On Render, FFmpeg should be available via imageio-ffmpeg.")
-    except Exception as e:
-        print(f"⚠️ Warning: Could not verify FFmpeg: {e}")
-        print("   Video processing may fail if FFmpeg is not available.")
 
-    paths = (config or {}).get("paths") or {}
     video_cfg = (config or {}).get("video") or {}
-    text_cfg = (config or {}).get("text_overlay") or {}
-
-    texts_file = paths.get("texts_file", TEXTS_FILE)
-    base_video = paths.get("base_video", BASE_VIDEO)
-    output_video = paths.get("output_video", OUTPUT_VIDEO)
-
     max_duration_seconds = int(video_cfg.get("max_duration_seconds", 15))
     video_size = tuple(video_cfg.get("size", list(VIDEO_SIZE)))
     fps = int(video_cfg.get("fps", 24))
     placeholder_bg = tuple(video_cfg.get("placeholder_bg_color", [20, 30, 60]))
 
-    # Get font path from config, or find system font
-    config_font_path = text_cfg.get("font_path", "")
-    if config_font_path and os.path.exists(config_font_path):
-        font_path = config_font_path
-    else:
-        # Try to find font automatically
-        found_font = find_font_path()
-        if found_font:
-            font_path = found_font
-            print(f"✅ Using system font: {font_path}")
-        else:
-            # Fallback to default
-            font_path = FONT_PATH
-            print(f"⚠️ Using fallback font path: {font_path}")
-    font_size = int(text_cfg.get("font_size", FONT_SIZE))
-    min_font_size = int(text_cfg.get("min_font_size", 38))
-    color = _hex_to_rgb(text_cfg.get("color"), fallback=TEXT_COLOR)
-    shadow_color = _hex_to_rgb(text_cfg.get("shadow_color"), fallback=SHADOW_COLOR)
-    shadow_offset = int(text_cfg.get("shadow_offset", 2))
-    max_width_pct = float(text_cfg.get("max_width_pct", 0.86))
-    max_height_pct = float(text_cfg.get("max_height_pct", 0.55))
-    line_spacing_px = int(text_cfg.get("line_spacing_px", 14))
-    align = str(text_cfg.get("align", "center")).lower()
-
-    position_mode = str(text_cfg.get("position_mode", "preset")).lower()
-    preset = str(text_cfg.get("preset", "center")).lower()
-    x_pct = float(text_cfg.get("x_pct", 0.5))
-    y_pct = float(text_cfg.get("y_pct", 0.5))
-    
-    # 1. Select Text
-    texts = load_texts(texts_file)
-    selected_text = random.choice(texts)
-    print(f"📝 Selected Text: {selected_text}")
-    
-    # 2. Prepare Base Video
+    # Prepare Base Video
     if os.path.exists(base_video):
         print(f"🎬 Loading base video: {base_video}")
         clip = VideoFileClip(base_video)
@@ -398,7 +940,7 @@ def generate_video(config=None):
         # Let's keep it simple: take subclip up to 15s if it's too long, or loop if too short?
         # For now, just use it.
         if max_duration_seconds > 0 and clip.duration > max_duration_seconds:
-            clip = clip.subclip(0, max_duration_seconds)
+            clip = _subclip_compat(clip, 0, max_duration_seconds)
     else:
         print(f"⚠️ {base_video} not found! Generating a placeholder background.")
         # Create a dynamic-looking background (e.g., gradient or solid color)
@@ -407,41 +949,232 @@ def generate_video(config=None):
         clip = ColorClip(size=video_size, color=placeholder_bg, duration=duration)
         clip = _set_fps_compat(clip, fps)
 
-    # 3. Create Text Overlay
-    # We generate an image for the text to ensure complex scripts (Arabic) render correctly without ImageMagick issues
-    w, h = clip.size
-    if position_mode == "manual":
-        pos = (int(w * x_pct), int(h * y_pct))
+    final_video = None
+    try:
+        overlay = build_text_overlay(selected_text, clip.size, font_path, config)
+        # Composite: blend the cropped overlay into each frame (only its bounding box is touched)
+        final_video = _image_transform_compat(clip, make_overlay_blender(overlay))
+        final_video.write_videofile(
+            output_video, 
+            codec='libx264', 
+            audio_codec='aac', 
+            fps=fps,
+            logger=None  # Suppress MoviePy verbose output
+        )
+    finally:
+        # Clean up clips to free memory
+        try:
+            if final_video is not None:
+                final_video.close()
+            clip.close()
+        except:
+            pass
+
+def _render_with_frame_cache(selected_text, font_path, base_video, output_video, config):
+    """Preview renderer: frames come zero-copy from the memory-mapped decode cache, only blend + encode run."""
+    import numpy as np
+    import ffmpeg_render
+    import frame_cache
+
+    video_cfg = (config or {}).get("video") or {}
+    max_duration_seconds = int(video_cfg.get("max_duration_seconds", 15))
+    fps = int(video_cfg.get("fps", 24))
+
+    frames = frame_cache.decoded_frames(config, base_video, fps, max_duration_seconds)
+    count, h, w = frames.shape[:3]
+    overlay = build_text_overlay(selected_text, (w, h), font_path, config)
+    blend = make_overlay_blender(overlay)
+    out = np.empty((h, w, 3), dtype=np.uint8)
+    ffmpeg_render.encode_frames(
+        (blend(frame, out=out) for frame in frames), (w, h), fps, output_video,
+        audio_source=base_video, duration=count / fps,
+    )
+
+def render_preview_frame(config=None, text=None, t=0.0, fmt="jpeg", quality=85):
+    """
+    Still preview: one frame of the base at t seconds with the text overlay
+    blended in, encoded as JPEG/PNG bytes. No video is encoded, and both the
+    frame and the overlay come from their caches, so style edits render in
+    milliseconds. text defaults to the first quote of the texts file.
+    """
+    import io
+    import numpy as np
+    from PIL import Image
+
+    paths = (config or {}).get("paths") or {}
+    video_cfg = (config or {}).get("video") or {}
+    if not text:
+        texts = load_texts(paths.get("texts_file", TEXTS_FILE))
+        text = texts[0] if texts else ""
+
+    base_video = paths.get("base_video", BASE_VIDEO)
+    if os.path.exists(base_video):
+        import frame_cache
+        import ingest
+        # Same frame size as the real render: the normalized base if it is ready
+        source = ingest.resolve_base_video(config, base_video, wait_seconds=0)
+        frame = frame_cache.still_frame(config, source, t)
     else:
-        if preset == "top":
-            pos = (int(w * 0.5), int(h * 0.22))
-        elif preset == "bottom":
-            pos = (int(w * 0.5), int(h * 0.78))
-        else:
-            pos = (int(w * 0.5), int(h * 0.5))
+        w, h = video_cfg.get("size", list(VIDEO_SIZE))
+        color = tuple(video_cfg.get("placeholder_bg_color", [20, 30, 60]))
+        frame = np.empty((int(h), int(w), 3), dtype=np.uint8)
+        frame[...] = color
 
-    txt_img_array = create_text_image(
-        selected_text,
-        clip.size,
-        font_path,
-        font_size,
-        color,
-        shadow_color=shadow_color,
-        shadow_offset=shadow_offset,
-        max_width_pct=max_width_pct,
-        max_height_pct=max_height_pct,
-        line_spacing_px=line_spacing_px,
-        align=align,
-        position=pos,
-        min_font_size=min_font_size,
+    h, w = frame.shape[:2]
+    overlay = build_text_overlay(text, (w, h), font_for_text(text, config, verbose=False), config)
+    image = Image.fromarray(make_overlay_blender(overlay)(frame))
+
+    buf = io.BytesIO()
+    if str(fmt).lower() == "png":
+        image.save(buf, format="PNG", compress_level=1)
+    else:
+        image.save(buf, format="JPEG", quality=int(quality))
+    return buf.getvalue()
+
+def get_render_cache(config=None):
+    cache_cfg = (config or {}).get("cache") or {}
+    directory = os.path.join(cache_cfg.get("dir", CACHE_DIR), "renders")
+    max_bytes = int(cache_cfg.get("renders_max_mb", 1024)) * 1024 * 1024
+    return disk_cache.get_cache("renders", directory, max_bytes)
+
+def render_spec_key(config, text, font_path, render_base, quality="final", renditions=None, render_path="engine"):
+    """
+    Deterministic hash of everything that determines the rendered bytes,
+    including the render path (draft / frame_cache / engine): they differ in
+    what they produce, e.g. the frame-cache preview makes no renditions.
+    """
+    config = config or {}
+    return disk_cache.make_key(
+        "render", RENDER_CACHE_VERSION, OVERLAY_CACHE_VERSION, quality, render_path,
+        text,
+        disk_cache.file_fingerprint(font_path),
+        disk_cache.file_fingerprint(render_base),
+        config.get("text_overlay") or {},
+        config.get("video") or {},
+        (config.get("preview") or {}) if quality == "draft" else None,
+        renditions or {},
     )
+
+def _restore_cached_render(cache, spec_key, output_video, config, renditions):
+    """Copy a cached render (main output + renditions) into place. False if it is not (fully) cached."""
+    import shutil
+
+    manifest_path = cache.get(spec_key, ".json")
+    if not manifest_path:
+        return False
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            outputs = json.load(f).get("outputs") or {}
+    except (OSError, ValueError):
+        return False
+    sources = {}
+    for name, entry_key in outputs.items():
+        path = cache.get(entry_key, ".mp4")
+        if not path:
+            return False  # part of it was evicted: render again
+        sources[name] = path
+    if "main" not in sources:
+        return False
+    if any(target not in sources for target in renditions):
+        return False  # stored without a requested rendition: render again so uploaders get it
+    for name, path in sources.items():
+        dest = output_video if name == "main" else rendition_path(config, name, renditions.get(name))
+        shutil.copyfile(path, dest)
+    return True
+
+def _store_render(cache, spec_key, output_video, config, renditions):
+    """Store the main output and every rendition that was produced, plus the manifest tying them to spec_key."""
+    import shutil
+
+    produced = {"main": output_video}
+    for target, profile in renditions.items():
+        path = rendition_path(config, target, profile)
+        if os.path.exists(path):
+            produced[target] = path
+    outputs = {}
+    for name, path in produced.items():
+        entry_key = disk_cache.make_key(spec_key, name)
+        cache.put(entry_key, ".mp4", lambda tmp, src=path: shutil.copyfile(src, tmp))
+        outputs[name] = entry_key
+
+    def write_manifest(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"outputs": outputs}, f)
+
+    cache.put(spec_key, ".json", write_manifest)
+
+def resolve_render_base(config=None, wait_seconds=None):
+    """
+    Base video a render should read: the ingested (normalized) copy of
+    paths.base_video when it is ready, else the original. Call it in the web
+    server process, which owns the ingest jobs, and hand the result to
+    generate_video(render_base=...) running in a render worker. wait_seconds
+    bounds the wait for a running ingest (default ingest.wait_seconds; 0 for
+    interactive requests, which should not block on a transcode).
+    """
+    base_video = ((config or {}).get("paths") or {}).get("base_video", BASE_VIDEO)
+    if not os.path.exists(base_video):
+        return base_video
+    import ingest
+    return ingest.resolve_base_video(config, base_video, wait_seconds=wait_seconds)
+
+def generate_video(config=None, renditions=None, preview=False, quality="final", render_base=None):
+    """
+    Main function to generate the daily video.
+
+    config["video"]["engine"] picks the renderer: "ffmpeg" (overlay filter in a
+    single ffmpeg process), "moviepy" (Python frame loop) or "auto" (default:
+    ffmpeg, falling back to MoviePy if it fails).
+
+    renditions: profiles keyed by publish target (default config["video"]["renditions"]),
+    e.g. {"tiktok": {"max_bitrate": "6M"}}. With the ffmpeg engine they are
+    encoded next to the main output in the same pass; video_path_for(config,
+    target) gives the file each uploader should send.
+
+    preview: with config["cache"]["frame_cache"] on, render from the decoded
+    frame cache so repeated previews skip decoding the base.
+
+    quality="draft": a quick motion check instead of the final render, scaled
+    by preview.draft_scale, cut to preview.draft_max_seconds and encoded with
+    an ultrafast preset (ffmpeg only, no renditions).
+
+    With cache.render_cache on, a render whose full spec (text, base, font,
+    style, video settings, renditions) matches a stored one is copied from the
+    render cache instead of being rendered again.
+
+    render_base: base video already resolved by resolve_render_base() (render
+    workers get it from the server, so they never wait on or start an ingest).
+    """
+    print("--- 🚀 Starting Video Automation System ---")
     
-    txt_clip = _set_duration_compat(ImageClip(txt_img_array), clip.duration)
+    # Check FFmpeg availability (required by MoviePy)
+    try:
+        import imageio_ffmpeg
+        ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()
+        if not ffmpeg_path or not os.path.exists(ffmpeg_path):
+            print("⚠️ Warning: FFmpeg not found. Video processing may fail.")
+            print("   On Render, FFmpeg should be available via imageio-ffmpeg.")
+    except Exception as e:
+        print(f"⚠️ Warning: Could not verify FFmpeg: {e}")
+        print("   Video processing may fail if FFmpeg is not available.")
+
+    paths = (config or {}).get("paths") or {}
+    video_cfg = (config or {}).get("video") or {}
+
+    texts_file = paths.get("texts_file", TEXTS_FILE)
+    base_video = paths.get("base_video", BASE_VIDEO)
+    output_video = paths.get("output_video", OUTPUT_VIDEO)
+    engine = str(video_cfg.get("engine", "auto")).lower()
+    renditions = get_renditions(config, renditions)
     
-    # 4. Composite
-    final_video = CompositeVideoClip([clip, txt_clip])
+    # 1. Select Text
+    texts = load_texts(texts_file)
+    selected_text = random.choice(texts)
+    print(f"📝 Selected Text: {selected_text}")
+
+    font_path = font_for_text(selected_text, config)
     
-    # 5. Export
+    # 2. Render: base video + text overlay -> output
     print(f"💾 Exporting to {output_video}...")
     try:
         # Ensure output directory exists
@@ -449,21 +1182,66 @@ def generate_video(config=None):
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
             print(f"📁 Created output directory: {output_dir}")
-        
-        # Export with error handling
-        final_video.write_videofile(
-            output_video, 
-            codec='libx264', 
-            audio_codec='aac', 
-            fps=fps,
-            logger=None  # Suppress MoviePy verbose output
-        )
+
+        # Drop renditions from a previous run so uploaders never pick up a stale file
+        _drop_renditions(config, renditions)
+
+        # Render from the normalized copy of the base when the ingest has produced it
+        if render_base is None:
+            render_base = resolve_render_base(config)
+        if render_base != base_video:
+            print(f"📥 Using normalized base: {render_base}")
+
+        rendered = False
+        cache_cfg = (config or {}).get("cache") or {}
+        use_frame_cache = bool(preview and cache_cfg.get("frame_cache") and os.path.exists(render_base))
+        render_cache = spec_key = None
+        if cache_cfg.get("render_cache", True):
+            render_cache = get_render_cache(config)
+            render_path = "draft" if quality == "draft" else ("frame_cache" if use_frame_cache else "engine")
+            spec_key = render_spec_key(
+                config, selected_text, font_path, render_base, quality, renditions, render_path,
+            )
+            if _restore_cached_render(render_cache, spec_key, output_video, config, renditions):
+                print("♻️ Identical render found in the render cache, reusing it")
+                render_cache = None  # nothing new to store
+                rendered = True
+
+        if not rendered and quality == "draft":
+            _render_draft(selected_text, font_path, render_base, output_video, config)
+            rendered = True
+        elif not rendered and use_frame_cache:
+            try:
+                _render_with_frame_cache(selected_text, font_path, render_base, output_video, config)
+                rendered = True
+            except Exception as e:
+                print(f"⚠️ Frame-cache preview failed, rendering normally: {e}")
+        if not rendered and engine in ("auto", "ffmpeg"):
+            try:
+                _render_with_ffmpeg(selected_text, font_path, render_base, output_video, config, renditions)
+                rendered = True
+            except Exception as e:
+                # A failed one-pass encode leaves truncated/empty renditions behind
+                _drop_renditions(config, renditions)
+                if engine == "ffmpeg":
+                    raise
+                print(f"⚠️ FFmpeg render failed, falling back to MoviePy: {e}")
+        if not rendered:
+            _render_with_moviepy(selected_text, font_path, render_base, output_video, config)
+            if renditions:
+                print("⚠️ Renditions need the ffmpeg engine; all targets will get the main output.")
         
         if not os.path.exists(output_video):
             raise RuntimeError(f"Video file was not created: {output_video}")
         
         file_size = os.path.getsize(output_video)
         print(f"✅ Video generated successfully! Size: {file_size / 1024 / 1024:.2f} MB")
+
+        if render_cache is not None:
+            try:
+                _store_render(render_cache, spec_key, output_video, config, renditions)
+            except Exception as e:
+                print(f"⚠️ Could not store the render in the cache: {e}")
     except Exception as e:
         error_msg = f"❌ Failed to export video: {e}"
         print(error_msg)
@@ -476,21 +1254,15 @@ def generate_video(config=None):
             except:
                 pass
         raise RuntimeError(error_msg) from e
-    finally:
-        # Clean up clips to free memory
-        try:
-            final_video.close()
-            if 'clip' in locals():
-                clip.close()
-            if 'txt_clip' in locals():
-                txt_clip.close()
-        except:
-            pass
     
     return selected_text
 
-def upload_to_facebook(caption, config=None):
-    """Uploads the generated video to Facebook."""
+def upload_to_facebook(caption, config=None, video_path=None):
+    """
+    Uploads video_path (default: the config's paths.output_video) to the
+    Facebook page, chunked and resumable unless facebook_upload.chunked is
+    false. Returns the video id; raises on upload failures.
+    """
     
     # Load from config if passed, otherwise look for local logic or defaults
     if config:
@@ -505,30 +1277,15 @@ def upload_to_facebook(caption, config=None):
         print("⚠️ Facebook credentials not set. Video generated but not uploaded.")
         return
 
-    print("🚀 Uploading to Facebook...")
-    url = f"https://graph-video.facebook.com/v18.0/{PAGE_ID}/videos"
-    
-    try:
-        # Open file safely
-        with open(OUTPUT_VIDEO, 'rb') as video_file:
-            files = {
-                'file': video_file
-            }
-            data = {
-                'description': caption,
-                'access_token': ACCESS_TOKEN
-            }
-            
-            import requests
-            response = requests.post(url, files=files, data=data)
-            
-            if response.status_code == 200:
-                print("✅ Upload successful! Video ID:", response.json().get('id'))
-            else:
-                print(f"❌ Upload failed: {response.text}")
-                
-    except Exception as e:
-        print(f"❌ Error uploading: {e}")
+    video_path = video_path or ((config or {}).get("paths") or {}).get("output_video", OUTPUT_VIDEO)
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"Video file not found: {video_path}")
+
+    import facebook_upload
+    print(f"🚀 Uploading to Facebook: {video_path}")
+    video_id = facebook_upload.upload(PAGE_ID, ACCESS_TOKEN, video_path, caption, config)
+    print("✅ Upload successful! Video ID:", video_id)
+    return video_id
 
 if __name__ == "__main__":
     text = generate_video()
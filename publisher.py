@@ -0,0 +1,147 @@
+"""
+Concurrent fan-out publishing.
+
+publish() uploads one finished video to every requested target (Facebook,
+TikTok, YouTube...) at the same time instead of one after another, so the
+total publish time is that of the slowest upload rather than the sum. Each
+target runs in its own thread with its own timeout (publish.timeouts), a
+failing or hanging target never affects the others, and the per-target
+outcome and timing are returned and logged separately. A target is retried
+publish.retries[target] times within its timeout, but only for errors that
+declare themselves resumable (e.resumable, e.g. an interrupted chunked
+Facebook transfer), so an upload that may already have been accepted is
+never sent again.
+
+New targets are added to TARGETS: fn(post, config, video_path) -> result,
+where post is {"caption", "title", "description"}.
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+DEFAULT_TIMEOUT_SECONDS = 900
+DEFAULT_RETRIES = {"facebook": 2}  # Only targets that raise resumable errors benefit from retries
+RETRY_DELAY_SECONDS = 10
+
+
+def _facebook(post_data, config, video_path):
+    import post
+    return post.upload_to_facebook(post_data["caption"], config, video_path=video_path)
+
+
+def _tiktok(post_data, config, video_path):
+    import tiktok
+    return tiktok.upload_to_tiktok(post_data["caption"], config, video_path=video_path)
+
+
+def _youtube(post_data, config, video_path):
+    import youtube
+    video_id = youtube.upload_video(
+        title=post_data["title"],
+        description=post_data["description"],
+        file_path=video_path,
+        config=config,
+    )
+    if not video_id:
+        raise RuntimeError("YouTube returned no video ID")
+    return video_id
+
+
+TARGETS = {
+    "facebook": _facebook,
+    "tiktok": _tiktok,
+    "youtube": _youtube,
+}
+LABELS = {"facebook": "Facebook", "tiktok": "TikTok", "youtube": "YouTube"}
+
+
+def enabled_targets(config):
+    """Targets switched on in publish_targets (facebook defaults to on), in TARGETS order."""
+    targets = (config or {}).get("publish_targets") or {}
+    return [name for name in TARGETS if targets.get(name, name == "facebook")]
+
+
+def _timeout(config, target):
+    publish_cfg = (config or {}).get("publish") or {}
+    timeouts = publish_cfg.get("timeouts") or {}
+    return float(timeouts.get(target, publish_cfg.get("default_timeout", DEFAULT_TIMEOUT_SECONDS)))
+
+
+def _retries(config, target):
+    retries = ((config or {}).get("publish") or {}).get("retries") or {}
+    return max(0, int(retries.get(target, DEFAULT_RETRIES.get(target, 0))))
+
+
+def publish(config, video_path, caption, targets=None, title=None, description=None, log=print):
+    """
+    Upload to targets (default: enabled_targets(config)) concurrently.
+    video_path is a path, or a callable target -> path (e.g. per-target
+    renditions). Returns {target: {"ok", "seconds", "result", "error"}}.
+    """
+    if targets is None:
+        targets = enabled_targets(config)
+    post_data = {
+        "caption": caption,
+        "title": title or caption,
+        "description": description if description is not None else f"{caption} #shorts #quotes",
+    }
+
+    started = time.perf_counter()
+    running = {}
+    finished_at = {}
+    for target in targets:
+        fn = TARGETS.get(target)
+        future = Future()
+        running[target] = future
+        if fn is None:
+            future.set_exception(KeyError(f"Unknown publish target: {target}"))
+            continue
+        path = video_path(target) if callable(video_path) else video_path
+        log(f"🚀 Uploading to {LABELS.get(target, target)}: {path}")
+
+        def run(target=target, fn=fn, future=future, path=path):
+            retries = _retries(config, target)
+            deadline = started + _timeout(config, target)
+            try:
+                for attempt in range(retries + 1):
+                    try:
+                        result = fn(post_data, config, path)
+                        break
+                    except Exception as e:
+                        if (not getattr(e, "resumable", False) or attempt >= retries
+                                or time.perf_counter() + RETRY_DELAY_SECONDS >= deadline):
+                            raise
+                        log(f"🔁 {LABELS.get(target, target)} upload failed ({e}), "
+                            f"retry {attempt + 1}/{retries} in {RETRY_DELAY_SECONDS}s")
+                        time.sleep(RETRY_DELAY_SECONDS)
+            except BaseException as e:
+                finished_at[target] = time.perf_counter()
+                future.set_exception(e)
+            else:
+                finished_at[target] = time.perf_counter()
+                future.set_result(result)
+
+        # Daemon threads: a hung upload is abandoned at its timeout instead of blocking shutdown
+        threading.Thread(target=run, name=f"publish-{target}", daemon=True).start()
+
+    results = {}
+    for target, future in running.items():
+        label = LABELS.get(target, target)
+        timeout = _timeout(config, target)
+        try:
+            result = future.result(timeout=max(0.0, started + timeout - time.perf_counter()))
+            outcome = {"ok": True, "result": result, "error": None}
+        except TimeoutError:
+            outcome = {"ok": False, "result": None, "error": f"timed out after {timeout:.0f}s"}
+        except Exception as e:
+            outcome = {"ok": False, "result": None, "error": str(e)}
+        outcome["seconds"] = round(finished_at.get(target, time.perf_counter()) - started, 2)
+        if outcome["ok"]:
+            log(f"✅ {label} upload completed in {outcome['seconds']:.1f}s")
+        else:
+            log(f"❌ {label} upload failed after {outcome['seconds']:.1f}s: {outcome['error']}")
+        results[target] = outcome
+    total = time.perf_counter() - started
+    log(f"📤 Published to {sum(r['ok'] for r in results.values())}/{len(results)} target(s) in {total:.1f}s")
+    return results
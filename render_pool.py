@@ -0,0 +1,288 @@
+"""
+Out-of-process render workers.
+
+Rendering (numpy compositing, MoviePy, PIL) holds the GIL for long stretches
+and never hands its memory back, so inside the Flask process it stalls every
+other route and bloats the server. submit() instead runs the render function
+in one of render_workers.processes persistent Python subprocesses and returns
+a concurrent.futures.Future for its result.
+
+Workers are pre-warmed (post, numpy, PIL and MoviePy are imported before the
+first job) and recycled, i.e. replaced by a fresh warm process, after
+render_workers.max_jobs jobs or once their RSS passes max_rss_mb (default:
+40% of MemTotal, so recycling happens before the OOM killer steps in on a
+small instance). Functions
+and arguments travel pickled over the worker's stdin/stdout, so fn must be a
+module-level function (post.generate_video, gemini_image.create_video_from_image...).
+With render_workers.enabled false, submit() runs fn inline and returns a
+completed future.
+"""
+
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+
+MAX_RSS_FRACTION = 0.4
+
+_SETTINGS = {"processes": 1, "max_jobs": 25, "max_rss_mb": None}
+_TASKS = queue.Queue()
+_SLOTS = []  # one dispatcher thread per worker process
+_LOCK = threading.Lock()
+_STATS = {"jobs": 0, "failed": 0, "recycled": 0, "crashed": 0}
+_RETIRED_METRICS = {}  # render cache counters of workers that have exited
+_NON_ADDITIVE = frozenset({"max_size", "max_bytes"})
+
+WARM_MODULES = ("numpy", "PIL.Image", "post", "ffmpeg_render", "moviepy")
+
+
+def _settings(config):
+    import job_queue
+
+    workers_cfg = (config or {}).get("render_workers") or {}
+    max_rss_mb = workers_cfg.get("max_rss_mb")
+    return {
+        "enabled": bool(workers_cfg.get("enabled", True)),
+        "processes": max(1, int(workers_cfg.get("processes", 1))),
+        "max_jobs": max(1, int(workers_cfg.get("max_jobs", 25))),
+        "max_rss_mb": float(max_rss_mb if max_rss_mb is not None else job_queue.memory_share_mb(MAX_RSS_FRACTION)),
+    }
+
+
+def _rss_mb():
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return 0.0
+
+
+def merge_metrics(a, b):
+    """Combine two post.render_metrics() dicts: counters add up, limits and labels are kept."""
+    merged = dict(a)
+    for key, value in b.items():
+        if key not in merged:
+            merged[key] = value
+        elif isinstance(value, dict) and isinstance(merged[key], dict):
+            merged[key] = merge_metrics(merged[key], value)
+        elif key in _NON_ADDITIVE and isinstance(value, (int, float)):
+            merged[key] = max(merged[key] or 0, value)
+        elif isinstance(value, (int, float)) and isinstance(merged[key], (int, float)) and key not in ("dir",):
+            merged[key] = merged[key] + value
+    return merged
+
+
+def _render_metrics():
+    try:
+        import post
+        return post.render_metrics()
+    except Exception:
+        return {}
+
+
+def _child_main():
+    """Worker process loop: read (fn, args, kwargs) pickles from stdin, write results to stdout."""
+    import importlib
+
+    # The protocol owns the real stdout; the render's print() logs go to stderr
+    proto_in = os.fdopen(os.dup(0), "rb")
+    proto_out = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    # Ingest jobs live in the server process; a worker must not start its own
+    import ingest
+    ingest.BACKGROUND_INGEST = False
+
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+    pickle.dump(("ready", os.getpid(), _rss_mb()), proto_out)
+    proto_out.flush()
+
+    while True:
+        try:
+            task = pickle.load(proto_in)
+        except EOFError:
+            break
+        if task is None:
+            break
+        fn, args, kwargs = task
+        try:
+            reply = ("ok", fn(*args, **kwargs))
+            pickle.dumps(reply[1])
+        except BaseException as e:
+            tb = traceback.format_exc()
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = RuntimeError(f"{type(e).__name__}: {e}")
+            reply = ("error", e, tb)
+        pickle.dump((*reply, _render_metrics(), _rss_mb()), proto_out)
+        proto_out.flush()
+
+
+class _Worker:
+    """One warm subprocess and its pipes."""
+
+    def __init__(self):
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(p for p in (package_dir, env.get("PYTHONPATH")) if p)
+        env.setdefault("PYTHONUNBUFFERED", "1")
+        self.proc = subprocess.Popen(
+            [sys.executable, "-c", "import render_pool; render_pool._child_main()"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env,
+        )
+        self.jobs = 0
+        self.metrics = {}
+        self.started = time.time()
+        _, self.pid, self.rss_mb = pickle.load(self.proc.stdout)
+        print(f"🔥 Render worker {self.pid} ready ({self.rss_mb:.0f} MB)")
+
+    def run(self, fn, args, kwargs):
+        pickle.dump((fn, args, kwargs), self.proc.stdin)
+        self.proc.stdin.flush()
+        reply = pickle.load(self.proc.stdout)
+        self.jobs += 1
+        self.rss_mb = reply[-1]
+        self.metrics = reply[-2]
+        return reply[:-2]
+
+    def stop(self):
+        try:
+            pickle.dump(None, self.proc.stdin)
+            self.proc.stdin.close()
+            self.proc.wait(timeout=10)
+        except Exception:
+            self.proc.kill()
+
+
+class _Slot(threading.Thread):
+    """Dispatcher thread owning one worker process: feeds it tasks, recycles it when due."""
+
+    def __init__(self, index):
+        super().__init__(name=f"render-slot-{index}", daemon=True)
+        self.worker = None
+
+    def _retire(self):
+        """Keep the exiting worker's cache counters in the pool totals."""
+        global _RETIRED_METRICS
+        if self.worker is not None:
+            with _LOCK:
+                _RETIRED_METRICS = merge_metrics(_RETIRED_METRICS, self.worker.metrics)
+
+    def _spawn(self):
+        try:
+            self.worker = _Worker()
+        except Exception as e:
+            print(f"❌ Could not start a render worker: {e}")
+            self.worker = None
+
+    def run(self):
+        self._spawn()
+        while True:
+            future, fn, args, kwargs = _TASKS.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            if self.worker is None or self.worker.proc.poll() is not None:
+                self._retire()
+                self._spawn()
+            if self.worker is None:
+                future.set_exception(RuntimeError("No render worker available"))
+                continue
+            try:
+                reply = self.worker.run(fn, args, kwargs)
+            except (EOFError, OSError, pickle.PickleError) as e:
+                with _LOCK:
+                    _STATS["crashed"] += 1
+                print(f"❌ Render worker {self.worker.pid} died: {e}")
+                self.worker.proc.kill()
+                self._retire()
+                self._spawn()
+                future.set_exception(RuntimeError(f"Render worker died: {e}"))
+                continue
+
+            with _LOCK:
+                _STATS["jobs"] += 1
+                if reply[0] != "ok":
+                    _STATS["failed"] += 1
+                settings = dict(_SETTINGS)
+            if reply[0] == "ok":
+                future.set_result(reply[1])
+            else:
+                print(f"📋 Render worker traceback:\n{reply[2]}")
+                future.set_exception(reply[1])
+
+            if self.worker.jobs >= settings["max_jobs"] or self.worker.rss_mb >= settings["max_rss_mb"]:
+                print(f"♻️ Recycling render worker {self.worker.pid} "
+                      f"({self.worker.jobs} jobs, {self.worker.rss_mb:.0f} MB)")
+                self.worker.stop()
+                self._retire()
+                with _LOCK:
+                    _STATS["recycled"] += 1
+                self._spawn()  # Warm replacement before the next job arrives
+
+
+def start(config):
+    """Apply render_workers settings and start (pre-warm) missing worker processes."""
+    settings = _settings(config)
+    if not settings["enabled"]:
+        return
+    with _LOCK:
+        _SETTINGS.update({k: settings[k] for k in ("processes", "max_jobs", "max_rss_mb")})
+        while len(_SLOTS) < _SETTINGS["processes"]:
+            slot = _Slot(len(_SLOTS))
+            _SLOTS.append(slot)
+            slot.start()
+
+
+def submit(config, fn, args=(), kwargs=None) -> Future:
+    """Run fn(*args, **kwargs) in a render worker; the Future resolves to its return value."""
+    args, kwargs = tuple(args), dict(kwargs or {})
+    future = Future()
+    if not _settings(config)["enabled"]:
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    start(config)
+    _TASKS.put((future, fn, args, kwargs))
+    return future
+
+
+def worker_metrics():
+    """post.render_metrics() summed over every worker process, past and present."""
+    with _LOCK:
+        merged = dict(_RETIRED_METRICS)
+        for slot in _SLOTS:
+            if slot.worker is not None:
+                merged = merge_metrics(merged, slot.worker.metrics)
+        return merged
+
+
+def stats():
+    """Worker pids, job counts and RSS (exposed by /render_metrics)."""
+    with _LOCK:
+        workers = [
+            {"pid": s.worker.pid, "jobs": s.worker.jobs, "rss_mb": round(s.worker.rss_mb, 1),
+             "uptime_s": round(time.time() - s.worker.started, 1)}
+            for s in _SLOTS if s.worker is not None
+        ]
+        return {**_STATS, "queued": _TASKS.qsize(), "settings": dict(_SETTINGS), "workers": workers}
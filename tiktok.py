@@ -1,6 +1,8 @@
 import time
 import requests
 
+import transport
+
 
 TIKTOK_AUTH_URL = "https://www.tiktok.com/v2/auth/authorize"
 TIKTOK_TOKEN_URL = "https://open.tiktokapis.com/v2/oauth/token/"
@@ -47,7 +49,7 @@ def exchange_code_for_token(code: str, cfg: dict) -> dict:
     }
     headers = {'Content-Type': 'application/x-www-form-urlencoded'}
 
-    response = requests.post(TIKTOK_TOKEN_URL, data=data, headers=headers)
+    response = transport.post(TIKTOK_TOKEN_URL, data=data, headers=headers)
     response.raise_for_status()
     return response.json()
 
@@ -68,7 +70,7 @@ def refresh_access_token(cfg: dict) -> dict:
     }
     headers = {'Content-Type': 'application/x-www-form-urlencoded'}
 
-    response = requests.post(TIKTOK_TOKEN_URL, data=data, headers=headers)
+    response = transport.post(TIKTOK_TOKEN_URL, data=data, headers=headers)
     response.raise_for_status()
     return response.json()
 
@@ -114,7 +116,7 @@ def upload_to_tiktok(caption: str, cfg: dict, video_path: str = "output.mp4"):
     init_data = {"post_info": {"title": caption, "description": caption}, "medi-info": {"media_type": "video"}}
 
     try:
-        init_response = requests.post(TIKTOK_UPLOAD_INIT_URL, headers=headers, json=init_data)
+        init_response = transport.post(TIKTOK_UPLOAD_INIT_URL, headers=headers, json=init_data)
         init_response.raise_for_status()
         init_json = init_response.json()
         
@@ -134,7 +136,9 @@ def upload_to_tiktok(caption: str, cfg: dict, video_path: str = "output.mp4"):
 
     try:
         with open(video_path, 'rb') as f:
-            upload_response = requests.put(upload_url, headers={'Content-Type': 'video/mp4'}, data=f)
+            upload_response = transport.put(
+                upload_url, headers={'Content-Type': 'video/mp4'}, data=f, timeout=transport.UPLOAD_TIMEOUT,
+            )
             upload_response.raise_for_status()
         # add_log("✅ Video uploaded to TikTok.") # Moved to main app loop
     except requests.exceptions.RequestException as e:
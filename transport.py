@@ -0,0 +1,148 @@
+"""
+Shared HTTP transport for the platform APIs (Facebook Graph, TikTok...).
+
+One pooled requests.Session per scheme://host keeps connections alive, so
+repeated calls to the same API skip the TCP/TLS handshake. Every request gets
+a (connect, read) timeout, so a stalled upload fails instead of hanging the
+job forever, and transient failures (connection errors, timeouts, 429 and
+5xx) are retried with exponential backoff plus jitter, honouring Retry-After.
+File bodies are rewound before each retry.
+
+Only idempotent requests get the full retry policy. A POST may have been
+processed even though the reply never arrived (a read timeout, a 5xx from a
+proxy), and repeating it could publish a video twice or burn a one-time OAuth
+code. So POSTs are only retried when the connection was never established,
+unless the caller passes idempotent=True (e.g. a chunk transfer addressed by
+offset).
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_TIMEOUT = (10, 60)  # (connect, read) seconds
+UPLOAD_TIMEOUT = (10, 600)  # Multi-MB bodies: allow a slow read of the response
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+DEFAULT_RETRIES = 3
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 30.0
+
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def session_for(url):
+    """The shared keep-alive requests.Session for url's scheme://host."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    parts = urlsplit(url)
+    key = f"{parts.scheme}://{parts.netloc}"
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=8)
+            session.mount(key, adapter)
+            _SESSIONS[key] = session
+        return session
+
+
+def _file_bodies(kwargs):
+    """(file object, start offset) for every seekable body in data/files, so retries can rewind them."""
+    candidates = []
+    data = kwargs.get("data")
+    if hasattr(data, "read"):
+        candidates.append(data)
+    for value in (kwargs.get("files") or {}).values():
+        if isinstance(value, (tuple, list)) and len(value) > 1:
+            value = value[1]
+        if hasattr(value, "read"):
+            candidates.append(value)
+    bodies = []
+    for f in candidates:
+        try:
+            bodies.append((f, f.tell()))
+        except (AttributeError, OSError):
+            bodies.append((f, None))
+    return bodies
+
+
+def _not_sent(error):
+    """True if error happened while connecting, i.e. the server never saw the request."""
+    import requests
+    from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError) or not error.args:
+        return False
+    reason = error.args[0]
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    return isinstance(reason, NewConnectionError)
+
+
+def _backoff(attempt, response=None):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(MAX_BACKOFF_SECONDS, float(retry_after))
+        except ValueError:
+            pass
+    # Full jitter: uniform over [0, base * 2^attempt], capped
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * (2 ** attempt)))
+
+
+def request(method, url, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, idempotent=None, **kwargs):
+    """
+    requests.request through the pooled session for url's host, retrying
+    transient failures up to retries times. idempotent defaults to the
+    method's semantics; non-idempotent requests are only retried on connect
+    failures. Returns the last response (which may still be an error status);
+    raises the last exception if no attempt got a response.
+    """
+    import requests
+
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+
+    session = session_for(url)
+    bodies = _file_bodies(kwargs)
+    for attempt in range(retries + 1):
+        if attempt:
+            for f, offset in bodies:
+                if offset is None:
+                    raise RuntimeError(f"Cannot retry {method} {url}: request body is not seekable")
+                f.seek(offset)
+        response = None
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt >= retries or not (idempotent or _not_sent(e)):
+                raise
+            reason = type(e).__name__
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt >= retries or not idempotent:
+                return response
+            reason = f"HTTP {response.status_code}"
+        delay = _backoff(attempt, response)
+        host = urlsplit(url).netloc
+        print(f"🔁 {method} {host} failed ({reason}), retry {attempt + 1}/{retries} in {delay:.1f}s")
+        if response is not None:
+            response.close()
+        time.sleep(delay)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request("PUT", url, **kwargs)